@@ -0,0 +1,116 @@
+"""
+Timing summaries, result files and baseline comparison shared by the benchmarks.
+
+Results are flat JSON: {"meta": {...}, "results": {name: summary}}, where a
+summary holds the call count, mean/p50/p99 latency in milliseconds, throughput
+and the peak RSS of the benchmarking process so far.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(durations, wall_seconds=None, errors=0, **extra):
+    """
+    Latency statistics of per-call `durations` (seconds). Throughput is calls per
+    second of `wall_seconds` when calls overlapped, otherwise of their summed time.
+    """
+    durations = np.asarray(durations, dtype=np.float64)
+    total = wall_seconds if wall_seconds is not None else durations.sum()
+    summary = {
+        "calls": len(durations),
+        "errors": errors,
+        "mean_ms": round(float(durations.mean()) * 1000, 4) if len(durations) else None,
+        "p50_ms": round(float(np.percentile(durations, 50)) * 1000, 4) if len(durations) else None,
+        "p99_ms": round(float(np.percentile(durations, 99)) * 1000, 4) if len(durations) else None,
+        "throughput_per_s": round(len(durations) / total, 4) if total else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    summary.update(extra)
+    return summary
+
+
+def timed(func, *args, **kwargs):
+    """Call `func` and return (result, seconds)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**settings):
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **settings,
+    }
+
+
+def write_results(results, output_path, meta):
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+    return output_path
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, threshold=0.1, min_delta_ms=0.5):
+    """
+    Compare the p50 latency of every benchmark present in both runs. Returns
+    rows of (name, baseline p50, current p50, ratio, status); a benchmark is a
+    regression when it is more than `threshold` (a fraction) and `min_delta_ms`
+    slower, or when it errors now and did not before. The absolute floor keeps
+    timer noise on sub-millisecond ops from counting as a change.
+    """
+    rows = []
+    for name in sorted(set(results) & set(baseline)):
+        current, previous = results[name], baseline[name]
+        if current.get("errors") and not previous.get("errors"):
+            rows.append((name, previous.get("p50_ms"), current.get("p50_ms"), None, "error"))
+            continue
+        if not current.get("p50_ms") or not previous.get("p50_ms"):
+            continue
+        ratio = current["p50_ms"] / previous["p50_ms"]
+        status = "same"
+        if abs(current["p50_ms"] - previous["p50_ms"]) >= min_delta_ms:
+            status = "slower" if ratio > 1 + threshold else "faster" if ratio < 1 - threshold else "same"
+        rows.append((name, previous["p50_ms"], current["p50_ms"], round(ratio, 3), status))
+    return rows
+
+
+def print_comparison(rows):
+    """Print the changed benchmarks and return the number of regressions."""
+    regressions = 0
+    for name, previous, current, ratio, status in rows:
+        if status == "same":
+            continue
+        regressions += status in ("slower", "error")
+        print(f"{status:>6}  {name}: p50 {previous} ms -> {current} ms" + (f" (x{ratio})" if ratio else ""))
+    print(f"{len(rows)} benchmarks compared, {regressions} regressions")
+    return regressions
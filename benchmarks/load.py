@@ -0,0 +1,128 @@
+"""
+Load test of /upload/, /apply_preprocess/ and /apply_augmentation/ with an
+in-process ASGI client: requests go straight to the app, its worker pools and
+event loop, with no server or network in between. Each endpoint, option and
+input is hit `requests` times with at most `concurrency` requests in flight.
+
+Latency is measured at the client. Peak RSS covers this process only; text
+jobs run in worker processes that are not included.
+"""
+import asyncio
+import os
+import time
+import uuid
+
+from utils.pipeline import PREPROCESS_OPS, AUGMENTATION_OPS
+
+from benchmarks.common import summarize
+
+ENDPOINTS = {
+    "preprocess": ("/apply_preprocess/", PREPROCESS_OPS),
+    "augmentation": ("/apply_augmentation/", AUGMENTATION_OPS),
+}
+
+
+def make_client(app):
+    import httpx
+    if hasattr(httpx, "ASGITransport"):
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+    return httpx.AsyncClient(app=app, base_url="http://benchmark")
+
+
+async def drive(send, requests, concurrency):
+    """
+    Call `send(i)` for i in range(requests), at most `concurrency` at a time.
+    `send` returns whether the request succeeded. Returns (durations, errors, wall seconds).
+    """
+    durations, errors = [], 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in pending:
+            started = time.perf_counter()
+            try:
+                ok = await send(i)
+            except Exception:
+                ok = False
+            durations.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return durations, errors, time.perf_counter() - started
+
+
+def _succeeded(response):
+    if response.status_code != 200:
+        return False
+    if response.headers.get("content-type", "").startswith("application/json"):
+        return not str(response.json().get("output", "")).startswith("Error")
+    return True
+
+
+async def _run_load(app, inputs, concurrency, requests, endpoints, options):
+    results = {}
+    run_id = uuid.uuid4().hex[:8]
+    upload_dir = os.path.join("static", "uploads")
+    async with make_client(app) as client:
+        for file_type, file_inputs in inputs.items():
+            for label, path in file_inputs:
+                with open(path, "rb") as f:
+                    content = f.read()
+                extension = os.path.splitext(path)[1]
+
+                async def upload(i, name=None):
+                    name = name or f"benchmark-{run_id}-{label}-{i}{extension}"
+                    response = await client.post("/upload/", files={"file": (name, content)})
+                    return response.status_code == 200
+
+                if "upload" in endpoints:
+                    key = f"load/upload/{file_type}/{label}"
+                    durations, errors, wall = await drive(upload, requests, concurrency)
+                    results[key] = summarize(durations, wall, errors, concurrency=concurrency)
+                    print(f"{key}: p50 {results[key]['p50_ms']} ms, {results[key]['throughput_per_s']} req/s")
+
+                # The apply endpoints all work on one upload of the input
+                name = f"benchmark-{run_id}-{label}{extension}"
+                await upload(None, name)
+                for stage, (url, tables) in ENDPOINTS.items():
+                    if stage not in endpoints:
+                        continue
+                    for option in tables.get(file_type, {}):
+                        if options and option not in options:
+                            continue
+                        payload = {"file_path": os.path.join(upload_dir, name), "file_type": file_type,
+                                   "option": option, "params": {}}
+
+                        async def apply(i):
+                            return _succeeded(await client.post(url, json=payload))
+
+                        key = f"load/{stage}/{file_type}/{option}/{label}"
+                        durations, errors, wall = await drive(apply, requests, concurrency)
+                        results[key] = summarize(durations, wall, errors, concurrency=concurrency)
+                        print(f"{key}: p50 {results[key]['p50_ms']} ms, {results[key]['throughput_per_s']} req/s")
+
+    for name in os.listdir(upload_dir):
+        if name.startswith(f"benchmark-{run_id}-"):
+            os.remove(os.path.join(upload_dir, name))
+    return results
+
+
+def run_load(inputs, concurrency=8, requests=50, endpoints=("upload", "preprocess", "augmentation"), options=None,
+             cache=False):
+    """
+    Load-test the app in this process; results are keyed
+    "load/<endpoint>/<file type>[/<option>]/<input>". Without `cache` the result
+    cache is disabled, so repeated requests measure the ops rather than cache hits.
+    Must run from the repository root, where the app finds static/ and templates/.
+    """
+    import main
+    if not cache:
+        main.result_cache.memory.max_bytes = 0
+        main.result_cache.disk = None
+    main.preload_modalities()
+    try:
+        return asyncio.run(_run_load(main.app, inputs, concurrency, requests, endpoints, options))
+    finally:
+        main.stop_workers()
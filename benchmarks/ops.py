@@ -0,0 +1,79 @@
+"""
+Per-op benchmarks. Every preprocessing and augmentation op of every modality
+is run on each synthetic input of that modality, in this process, and timed in
+three phases: decode (the modality's loader), compute (the op on the decoded
+data) and encode (the response encoder). A few multi-step chains are timed the
+way the pipeline runs them, with consecutive fusable ops sharing one pass.
+"""
+import time
+
+from utils import registry
+from utils.pipeline import LOADERS, STAGES, apply_op, fuse_ops, get_op, seed_everything
+from utils.responses import encode
+
+from benchmarks.common import summarize, timed
+
+CHAINS = {
+    "text": [["Lowercase", "StopWord Removal", "Stemming"]],
+    "image": [["Resizing", "Rotation", "Horizontal Flip", "Brightness Adjustment"]],
+    "audio": [["Time Stretching", "Pitch Shifting", "Spectral Masking"]],
+    "3d": [["Centering", "Normalization", "Rotation"]],
+}
+
+
+def bench_ops(file_type, path, ops, repeat=5, warmup=1):
+    """
+    Time decode, compute and encode of `ops` ((op reference, params) pairs) on
+    `path`. Each run decodes afresh and is seeded with its index, so random ops
+    do the same work in every benchmark run. Returns {phase: summary}.
+    """
+    registry.load_modality(file_type)
+    loader = registry.resolve(LOADERS[file_type])
+    ops = [(registry.resolve(op), params) for op, params in fuse_ops(ops)]
+    durations = {"decode": [], "compute": [], "encode": []}
+    for run in range(warmup + repeat):
+        seed_everything(run)
+        data, decode_seconds = timed(loader, path)
+        started = time.perf_counter()
+        for op, params in ops:
+            data = apply_op(op, data, params)
+        compute_seconds = time.perf_counter() - started
+        _, encode_seconds = timed(encode, data, file_type)
+        if run >= warmup:
+            durations["decode"].append(decode_seconds)
+            durations["compute"].append(compute_seconds)
+            durations["encode"].append(encode_seconds)
+    return {phase: summarize(seconds) for phase, seconds in durations.items()}
+
+
+def _cases(file_type, options=None, chains=True):
+    """(name, ops) of every single op of `file_type`, then its chains."""
+    for stage, tables in STAGES.items():
+        for option, op in tables.get(file_type, {}).items():
+            if not options or option in options:
+                yield f"{stage}/{option}", [(op, None)]
+    if chains:
+        for chain in CHAINS.get(file_type, []):
+            yield "chain/" + "+".join(chain), [(get_op(file_type, option), None) for option in chain]
+
+
+def run_ops(inputs, repeat=5, warmup=1, options=None, chains=True):
+    """
+    Benchmark every op on every input ({file_type: [(label, path)]}). Results are
+    keyed "ops/<file type>/<stage or chain>/<option>/<input>/<phase>"; an op that
+    fails is recorded with its error instead of timings.
+    """
+    results = {}
+    for file_type, file_inputs in inputs.items():
+        for name, ops in _cases(file_type, options, chains):
+            for label, path in file_inputs:
+                key = f"ops/{file_type}/{name}/{label}"
+                try:
+                    phases = bench_ops(file_type, path, ops, repeat, warmup)
+                except Exception as e:
+                    print(f"{key}: Error: {e}")
+                    results[f"{key}/compute"] = {"calls": 0, "errors": 1, "error": str(e)}
+                    continue
+                print(f"{key}: " + ", ".join(f"{phase} {summary['p50_ms']} ms" for phase, summary in phases.items()))
+                results.update({f"{key}/{phase}": summary for phase, summary in phases.items()})
+    return results
@@ -0,0 +1,79 @@
+"""
+Benchmark runner. Run from the repository root:
+
+    python -m benchmarks.run generate --preset full
+    python -m benchmarks.run ops --output results/ops.json
+    python -m benchmarks.run load --concurrency 16 --requests 100 --output results/load.json
+    python -m benchmarks.run ops --baseline results/ops.json     # fails on regressions
+    python -m benchmarks.run compare results/new.json results/ops.json
+
+Synthetic inputs are generated into --data-dir on first use. With --baseline,
+the run is compared with an earlier results file and exits with status 1 if a
+benchmark got more than --threshold slower (p50) or started failing.
+"""
+import argparse
+import json
+import os
+import sys
+
+from benchmarks.common import compare, load_results, metadata, print_comparison, write_results
+from benchmarks.synthetic import PRESETS, generate
+
+BENCHMARK_DIR = os.environ.get("BENCHMARK_DIR", os.path.join(".cache", "benchmarks"))
+
+
+def _split(value):
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ops and endpoints on synthetic inputs.")
+    parser.add_argument("command", choices=["generate", "ops", "load", "compare"])
+    parser.add_argument("paths", nargs="*", help="compare: results file and baseline file")
+    parser.add_argument("--preset", choices=list(PRESETS), default="quick", help="Input sizes to generate")
+    parser.add_argument("--data-dir", default=os.path.join(BENCHMARK_DIR, "inputs"))
+    parser.add_argument("--file-types", help="Comma-separated modalities (default: all)")
+    parser.add_argument("--options", help="Comma-separated op names (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="ops: timed runs per op and input")
+    parser.add_argument("--warmup", type=int, default=1, help="ops: untimed runs first")
+    parser.add_argument("--concurrency", type=int, default=8, help="load: requests in flight")
+    parser.add_argument("--requests", type=int, default=50, help="load: requests per endpoint, option and input")
+    parser.add_argument("--endpoints", default="upload,preprocess,augmentation", help="load: endpoints to hit")
+    parser.add_argument("--cache", action="store_true", help="load: keep the result cache enabled")
+    parser.add_argument("--output", help="Results JSON (default: <benchmark dir>/<command>.json)")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown counted as a regression (fraction)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Smaller p50 changes are ignored")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        if len(args.paths) != 2:
+            parser.error("compare takes a results file and a baseline file")
+        results, baseline = (load_results(path) for path in args.paths)
+        sys.exit(1 if print_comparison(compare(results, baseline, args.threshold, args.min_delta_ms)) else 0)
+
+    inputs = generate(args.data_dir, args.preset, _split(args.file_types))
+    if args.command == "generate":
+        print(json.dumps(inputs, indent=2))
+        return
+
+    options = _split(args.options)
+    if args.command == "ops":
+        from benchmarks.ops import run_ops
+        results = run_ops(inputs, args.repeat, args.warmup, options)
+        settings = {"repeat": args.repeat, "warmup": args.warmup}
+    else:
+        from benchmarks.load import run_load
+        results = run_load(inputs, args.concurrency, args.requests, _split(args.endpoints), options, args.cache)
+        settings = {"concurrency": args.concurrency, "requests": args.requests, "cache": args.cache}
+
+    output = args.output or os.path.join(BENCHMARK_DIR, f"{args.command}.json")
+    write_results(results, output, metadata(command=args.command, preset=args.preset, **settings))
+    print(f"Wrote {len(results)} results to {output}")
+    if args.baseline:
+        sys.exit(1 if print_comparison(compare(results, load_results(args.baseline), args.threshold,
+                                                    args.min_delta_ms)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Synthetic benchmark inputs for every modality: JPEG images at several
+resolutions, WAV files at several durations and sample rates, Zipf-distributed
+text corpora and OFF sphere meshes from 1k to 1M vertices. Inputs are generated
+from a fixed seed and reused when they already exist.
+"""
+import os
+
+import numpy as np
+
+from utils.mesh_io import save_off
+
+PRESETS = {
+    "quick": {
+        "image": [(256, 256), (1024, 768)],
+        "audio": [(1, 16000), (5, 44100)],
+        "text": [1000],
+        "3d": [1000, 10000],
+    },
+    "full": {
+        "image": [(256, 256), (1024, 768), (1920, 1080), (4096, 4096)],
+        "audio": [(1, 16000), (10, 16000), (10, 44100), (60, 48000)],
+        "text": [1000, 10000, 100000],
+        "3d": [1000, 10000, 100000, 1000000],
+    },
+}
+
+# Common English words, so stopword removal, stemming and lemmatization have work to do
+WORDS = ("the of and to in is was for on that with as by at from it his an were are which this be "
+         "has had not but they have one their or its been first new who after two more also other "
+         "running jumped cities studies better walked houses children played faster making stories "
+         "quickly happily analysis networks learning models images sounds shapes voices colours").split()
+
+
+def make_image(path, size, rng):
+    """A smooth color gradient with noise, so JPEG coding and denoising behave as on photos."""
+    import cv2
+    width, height = size
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+    image += rng.normal(0, 12, image.shape).astype(np.float32)
+    cv2.imwrite(path, np.clip(image, 0, 255).astype(np.uint8))
+
+
+def make_wav(path, seconds, sample_rate, rng, channels=2):
+    """A noisy tone sweep with a quiet lead-in and tail, so silence trimming has something to cut."""
+    import soundfile as sf
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = 0.5 * np.sin(2 * np.pi * (220 + 440 * t / max(seconds, 1)) * t)
+    quiet = int(0.1 * len(t))
+    tone[:quiet] *= 0.001
+    tone[len(t) - quiet:] *= 0.001
+    audio = np.stack([tone + 0.01 * rng.standard_normal(len(t)) for _ in range(channels)], axis=1)
+    sf.write(path, audio.astype(np.float32), sample_rate, subtype="PCM_16")
+
+
+def make_text(path, lines, rng, words_per_line=12):
+    """Lines of Zipf-distributed words, with some capitals, digits and punctuation."""
+    vocab = WORDS + [f"word{i}" for i in range(5000)]
+    ranks = (rng.zipf(1.3, lines * words_per_line) - 1) % len(vocab)
+    words = [vocab[rank] for rank in ranks]
+    with open(path, "w") as f:
+        for i in range(lines):
+            line = words[i * words_per_line:(i + 1) * words_per_line]
+            line[0] = line[0].capitalize()
+            f.write(' '.join(line) + f", {i}!\n")
+
+
+def make_mesh(path, vertices, rng=None):
+    """A UV sphere triangulated from a grid of about `vertices` points."""
+    rings = max(2, int(np.sqrt(vertices / 2)))
+    segments = max(3, vertices // rings)
+    theta, phi = np.meshgrid(np.linspace(0.1, np.pi - 0.1, rings),
+                             np.linspace(0, 2 * np.pi, segments, endpoint=False), indexing="ij")
+    points = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], axis=-1)
+    points = points.reshape(-1, 3)
+    index = np.arange(rings * segments).reshape(rings, segments)
+    a, b = index[:-1], np.roll(index[:-1], -1, axis=1)
+    c, d = index[1:], np.roll(index[1:], -1, axis=1)
+    faces = np.concatenate([np.stack([a, b, c], axis=-1).reshape(-1, 3), np.stack([b, d, c], axis=-1).reshape(-1, 3)])
+    save_off(points, faces, path)
+
+
+def _input_spec(file_type, size):
+    """(label, file name, generator, generator args) of one input."""
+    if file_type == "image":
+        label = f"{size[0]}x{size[1]}"
+        return label, f"image_{label}.jpg", make_image, (size,)
+    if file_type == "audio":
+        label = f"{size[0]}s_{size[1]}hz"
+        return label, f"audio_{label}.wav", make_wav, size
+    if file_type == "text":
+        label = f"{size}_lines"
+        return label, f"text_{label}.txt", make_text, (size,)
+    label = f"{size}_vertices"
+    return label, f"mesh_{label}.off", make_mesh, (size,)
+
+
+def generate(data_dir, preset="quick", file_types=None, seed=0):
+    """Create the preset's missing inputs under `data_dir`; returns {file_type: [(label, path)]}."""
+    os.makedirs(data_dir, exist_ok=True)
+    inputs = {}
+    for file_type, sizes in PRESETS[preset].items():
+        if file_types and file_type not in file_types:
+            continue
+        inputs[file_type] = []
+        for size in sizes:
+            label, name, make, args = _input_spec(file_type, size)
+            path = os.path.join(data_dir, name)
+            if not os.path.exists(path):
+                # One generator per file, so an input's content does not depend on which others exist
+                make(path, *args, rng=np.random.default_rng(seed))
+            inputs[file_type].append((label, path))
+    return inputs
@@ -1,49 +1,32 @@
 import os
+import sys
+import logging
+import html
+import time
 import magic
 from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.requests import Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-# Text processing imports
-from utils.text_processing import (
-    tokenize, padding_truncating, lowercase, 
-    perform_stemming, perform_lemmatization, remove_stopwords
-)
-from utils.text_augmentation import (
-    random_insertion, synonym_replacement, 
-    random_swap, random_deletion
-)
-
-# Audio processing imports
-from utils.audio_processing import resample, normalize as audio_normalize, trim_silence, compress
-from utils.audio_augmentation import (
-    time_stretch, pitch_shift, add_noise, 
-    random_volume_adjustment, time_shift
-)
-
-# Image processing imports
-from utils.image_processing import (
-    resize, normalize as image_normalize, 
-    grayscaling, crop_image, denoise_image
-)
-from utils.image_augmentation import (
-    random_horizontal_flip, random_vertical_flip, 
-    random_rotation as image_rotation, 
-    random_scaling as image_scaling, color_jitter
-)
-
-# 3D processing imports
-from utils.three_d_processing import normalization as normalize_3d, centering
-from utils.three_d_augmentation import (
-    rotation as rotate_3d, 
-    scaling as scale_3d, 
-    adding_noise
-)
+from utils.pipeline import run_pipeline, is_deterministic
+from utils.cache import result_cache, file_digest, make_key
+from utils.asset_store import assets
+from utils.responses import run_and_encode, build_response, store_result
+from utils.batch import start_job, jobs as batch_jobs, TooManyJobsError
+from utils.executor import run_in_pool, stream_in_pool, uses_process_pool, QueueFullError, shutdown as shutdown_executor
+from utils import registry, metrics
+from utils.profiler import profiler, PROFILE_ON_START
+from utils.synonym_index import ensure_index as ensure_synonym_index
 
 app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# Most variants one /augment_3d_batch/ request may generate (the stack holds k copies of the mesh)
+MAX_3D_BATCH_K = int(os.environ.get("MAX_3D_BATCH_K", 256))
 
 app.add_middleware(
     CORSMiddleware,
@@ -57,38 +40,82 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 UPLOAD_DIR = "uploads"
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Bytes used for MIME sniffing and for the text preview
+SNIFF_BYTES = 8192
+PREVIEW_BYTES = 64 * 1024
 os.makedirs(os.path.join("static", UPLOAD_DIR), exist_ok=True)
 
+@app.on_event("startup")
+def build_synonym_index():
+    # Building walks all of WordNet, so only do it here when text is preloaded and NLTK is
+    # loaded in this process anyway; otherwise build it ahead of time with the CLI
+    if not {"text", "all"} & set(registry.PRELOAD_MODALITIES):
+        return
+    try:
+        ensure_synonym_index()
+    except Exception as e:
+        logger.warning("Synonym index not built, falling back to live WordNet lookups: %s", e)
+
+@app.on_event("startup")
+def preload_modalities():
+    # Modality backends (torch, NLTK, OpenCV, scipy) are imported on first use unless preloaded
+    registry.preload()
+    registry.mark_ready()
+    if PROFILE_ON_START:
+        profiler.start()
+
+@app.on_event("shutdown")
+def stop_workers():
+    shutdown_executor()
+
 @app.get("/", response_class=HTMLResponse)
 async def main(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+def save_upload(source, file_path):
+    """Copy an upload to disk chunk by chunk and return its first PREVIEW_BYTES for sniffing and preview."""
+    head = b""
+    with open(file_path, "wb") as f:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if len(head) < PREVIEW_BYTES:
+                head += chunk[:PREVIEW_BYTES - len(head)]
+            f.write(chunk)
+    return head
+
 @app.post("/upload/")
 async def upload_file(request: Request, file: UploadFile = File(...)):
-    content = await file.read()
+    filename = os.path.basename(file.filename)
+    file_path = os.path.join('static/', UPLOAD_DIR, filename)
+    # Stream to disk in a worker thread: memory stays O(chunk size), not O(file size)
+    head = await run_in_threadpool(save_upload, file.file, file_path)
+
     mime = magic.Magic(mime=True)
-    file_type = mime.from_buffer(content).split('/')[0]
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    
-    file_path = os.path.join('static/', UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(content)
+    file_type = mime.from_buffer(head[:SNIFF_BYTES]).split('/')[0]
+    file_extension = os.path.splitext(filename)[1].lower()
 
     input_display = ""
     if file_type == "image":
-        input_display = f"<img src='/static/{UPLOAD_DIR}/{file.filename}' alt='Uploaded Image' style='max-width: 100%; height: auto;' />"
+        input_display = f"<img src='/static/{UPLOAD_DIR}/{filename}' alt='Uploaded Image' style='max-width: 100%; height: auto;' />"
     elif file_type == "audio":
-        input_display = f"<audio controls><source src='/static/{UPLOAD_DIR}/{file.filename}' type='audio/mpeg'></audio>"
+        input_display = f"<audio controls><source src='/static/{UPLOAD_DIR}/{filename}' type='audio/mpeg'></audio>"
     elif file_extension == ".off":
         file_type = "3d"
         input_display = f"""
         <div id="3d-container" style="width: 100%; height: 400px;">
-            <canvas id="3d-canvas" data-model-path="/static/{UPLOAD_DIR}/{file.filename}"></canvas>
+            <canvas id="3d-canvas" data-model-path="/static/{UPLOAD_DIR}/{filename}"></canvas>
         </div>
         """
     elif file_type == "text":
-        lines = content.decode("utf-8").splitlines() 
-        input_display = "<br>".join(lines)
+        # Preview only the first PREVIEW_BYTES; a cut-off multi-byte character is dropped
+        lines = head.decode("utf-8", errors="ignore").splitlines()
+        if os.path.getsize(file_path) > PREVIEW_BYTES:
+            lines = lines[:-1] + ["…"]
+        input_display = "<br>".join(html.escape(line) for line in lines)
     else:
         file_type = "unsupported"
         input_display = "Unsupported file type."
@@ -103,134 +130,287 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
     augmentation_options = {
         "text": ["Synonym Replacement", "Random Insertion", "Random Deletion", "Random Swap"],
         "image": ["Horizontal Flip", "Vertical Flip", "Rotation", "Scaling", "Brightness Adjustment"],
-        "audio": ["Time Stretching", "Pitch Shifting", "Random Noise Addition", "Random Volume Adjustment", "Time Shifting"],
+        "audio": ["Time Stretching", "Pitch Shifting", "Random Noise Addition", "Random Volume Adjustment", "Time Shifting", "Spectral Masking"],
         "3d": ["Rotation", "Scaling", "Adding Noise"]
     }
 
+    upload_id = assets.register(file_path, file_type) if file_type != "unsupported" else ""
+
     return templates.TemplateResponse("index.html", {
         "request": request,
         "uploaded_content": input_display,
         "file_type": file_type,
+        "upload_id": upload_id,
         "preprocess_options": preprocess_options.get(file_type, []),
         "augmentation_options": augmentation_options.get(file_type, []),
         "file_path": file_path
     })
 
+def parse_seed(data):
+    seed = data.get("seed")
+    return int(seed) if seed is not None else None
+
+def busy_response(file_type):
+    """Back-pressure: tell the client to retry once the worker queue drains."""
+    return JSONResponse({"output": "Error: server busy, retry later", "file_type": file_type},
+                        status_code=503, headers={"Retry-After": "1"})
+
+def _hash_and_get(file_type, file_path, operation, seed):
+    key = make_key(file_digest(file_path), file_type, operation, seed)
+    return key, result_cache.get(key)
+
+async def lookup_cache(file_type, file_path, operation, seed=None):
+    """Return (cache key, cached (body, media_type) or None); the key is None if the file can't be hashed."""
+    try:
+        # Hashing and the disk tier read files, so both run off the event loop
+        return await run_in_pool(None, _hash_and_get, file_type, file_path, operation, seed)
+    except (OSError, TypeError, QueueFullError):
+        return None, None
+
+async def store_in_cache(key, body, media_type):
+    # Error messages are never cached
+    if key is not None and not (media_type is None and body.startswith("Error")):
+        try:
+            # Writing to the disk tier (and evicting from it) is blocking file I/O
+            await run_in_pool(None, result_cache.put, key, body, media_type)
+        except QueueFullError:
+            pass
+
+async def run_steps(endpoint, data, steps):
+    """
+    Shared body of the processing endpoints: resolve the input, answer from the
+    result cache when possible, otherwise run the steps in the worker pool.
+    """
+    started = time.perf_counter()
+    response, trace = await _run_steps(data, steps)
+    total = time.perf_counter() - started
+    metrics.record_request(endpoint, response.status_code, total)
+    if metrics.SERVER_TIMING or data.get("server_timing"):
+        response.headers["Server-Timing"] = metrics.server_timing(trace, total=total)
+    return response
+
+async def _run_steps(data, steps):
+    """Returns (response, trace of the job's phases; empty for cache hits and rejected jobs)."""
+    upload_id = data.get("upload_id")
+    file_path, file_type = assets.lookup(upload_id) if upload_id else (None, None)
+    if file_path is None:
+        # Unknown or expired upload id: fall back to the path sent by the client
+        file_path = data.get("file_path")
+        file_type = data.get("file_type")
+    # "binary" returns the raw image/audio/mesh bytes instead of JSON with a URL
+    binary = data.get("output_format") == "binary"
+    seed = parse_seed(data)
+    steps = [{"stage": step.get("stage"), "option": step.get("option"), "params": step.get("params") or {}}
+             for step in steps]
+
+    # Cache chains that are fully deterministic, or made reproducible by a seed
+    key = None
+    if seed is not None or is_deterministic(file_type, steps):
+        key, cached = await lookup_cache(file_type, file_path, steps, seed)
+        if cached is not None:
+            return await build_response(*cached, file_type, binary), []
+
+    # Decode once (or reuse the decoded upload), chain the ops in memory and encode only the final result.
+    # Seeded jobs reseed the global generators, so they run in an isolated worker process.
+    # The asset store is only used in this process: a store per worker process would multiply its memory bound.
+    isolated = seed is not None
+    store_id = None if uses_process_pool(file_type, isolated) else upload_id
+    try:
+        body, media_type, trace = await run_in_pool(file_type, run_and_encode, run_pipeline, file_type,
+                                                    file_path, file_type, steps, store_id,
+                                                    seed=seed, isolated=isolated)
+    except QueueFullError:
+        return busy_response(file_type), []
+    except Exception as e:
+        body, media_type, trace = f"Error: {str(e)}", None, getattr(e, "trace", [])
+    # Phases timed in the worker (thread or process) are counted here
+    metrics.record(trace)
+    await store_in_cache(key, body, media_type)
+
+    return await build_response(body, media_type, file_type, binary), trace
+
 @app.post("/apply_preprocess/")
 async def apply_preprocess(request: Request):
     data = await request.json()
-    option = data.get("option")
-    file_path = data.get("file_path")
-    file_type = data.get("file_type")
-    
-    # Text Preprocessing
-    if option == "Tokenize":
-        result = tokenize(file_path)
-    elif option == "Padding/Truncating":
-        result = padding_truncating(file_path)
-    elif option == "Lowercase":
-        result = lowercase(file_path)
-    elif option == "StopWord Removal":
-        result = remove_stopwords(file_path)
-    elif option == "Stemming":
-        result = perform_stemming(file_path)
-    elif option == "Lemmatization":
-        result = perform_lemmatization(file_path)
-    
-    # Image Preprocessing
-    elif option == "Resizing":
-        result = resize(file_path)
-    elif option == "Normalization" and file_type == "image":
-        result = image_normalize(file_path)
-    elif option == "Grayscaling":
-        result = grayscaling(file_path)
-    elif option == "Cropping":
-        result = crop_image(file_path)
-    elif option == "Denoising":
-        result = denoise_image(file_path)
-    
-    # Audio Preprocessing
-    elif option == "Resampling":
-        result = resample(file_path)
-    elif option == "Dynamic Range Compression":
-        result = compress(file_path)
-    elif option == "Normalization" and file_type == "audio":
-        result = audio_normalize(file_path)
-    elif option == "Trimming Silence":
-        result = trim_silence(file_path)
-    
-    # 3D Preprocessing
-    elif option == "Normalization" and file_type == "3d":
-        result = normalize_3d(file_path)
-        if not result.startswith("Error"):
-            result = '/static/uploads/' + os.path.basename(result)
-    elif option == "Centering" and file_type == "3d":
-        result = centering(file_path)
-        if not result.startswith("Error"):
-            result = '/static/uploads/' + os.path.basename(result)
-    else:
-        result = "Invalid option selected."
-
-    return JSONResponse({"output": result, "file_type": file_type})
+    return await run_steps("apply_preprocess", data, [{"stage": "preprocess", "option": data.get("option"), "params": data.get("params")}])
 
 @app.post("/apply_augmentation/")
 async def apply_augmentation(request: Request):
     data = await request.json()
-    option = data.get("option")
-    file_path = data.get("file_path")
-    file_type = data.get("file_type")
-
-    # Text Augmentation
-    if option == "Synonym Replacement":
-        result = synonym_replacement(file_path)
-    elif option == "Random Insertion":
-        result = random_insertion(file_path)
-    elif option == "Random Deletion":
-        result = random_deletion(file_path)
-    elif option == "Random Swap":
-        result = random_swap(file_path)
-    
-    # Image Augmentation
-    elif option == "Horizontal Flip" and file_type == "image":
-        result = random_horizontal_flip(file_path)
-    elif option == "Vertical Flip" and file_type == "image":
-        result = random_vertical_flip(file_path)
-    elif option == "Rotation" and file_type == "image":
-        result = image_rotation(file_path)
-    elif option == "Scaling" and file_type == "image":
-        result = image_scaling(file_path)
-    elif option == "Brightness Adjustment" and file_type == "image":
-        result = color_jitter(file_path)
-    
-    # Audio Augmentation
-    elif option == "Time Stretching":
-        result = time_stretch(file_path)
-    elif option == "Pitch Shifting":
-        result = pitch_shift(file_path)
-    elif option == "Random Noise Addition":
-        result = add_noise(file_path)
-    elif option == "Random Volume Adjustment":
-        result = random_volume_adjustment(file_path)
-    elif option == "Time Shifting":
-        result = time_shift(file_path)
-    
-    # 3D Augmentation
-    elif option == "Rotation" and file_type == "3d":
-        result = rotate_3d(file_path)
-        if not result.startswith("Error"):
-            result = '/static/uploads/' + os.path.basename(result)
-    elif option == "Scaling" and file_type == "3d":
-        result = scale_3d(file_path)
-        if not result.startswith("Error"):
-            result = '/static/uploads/' + os.path.basename(result)
-    elif option == "Adding Noise" and file_type == "3d":
-        result = adding_noise(file_path)
-        if not result.startswith("Error"):
-            result = '/static/uploads/' + os.path.basename(result)
-    else:
-        result = "Invalid option selected."
+    return await run_steps("apply_augmentation", data, [{"stage": "augmentation", "option": data.get("option"), "params": data.get("params")}])
+
+@app.post("/pipeline/")
+async def apply_pipeline(request: Request):
+    data = await request.json()
+    return await run_steps("pipeline", data, data.get("steps", []))
+
+@app.post("/stream_text/")
+async def stream_text(request: Request):
+    data = await request.json()
+    upload_id = data.get("upload_id")
+    file_path, _ = assets.lookup(upload_id) if upload_id else (None, None)
+    file_path = file_path or data.get("file_path")
+    steps = data.get("steps", [])
+    try:
+        # Lines are processed lazily on the op threads while the response is sent, in constant memory
+        chunks = await stream_in_pool(registry.call, "utils.text_stream:iter_chunks", file_path, steps)
+    except QueueFullError:
+        return busy_response("text")
+    except (ValueError, TypeError, OSError) as e:
+        return JSONResponse({"output": f"Error: {str(e)}", "file_type": "text"}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"output": f"Error: {str(e)}", "file_type": "text"}, status_code=500)
+
+    return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
+
+@app.post("/text_ids/")
+async def text_ids(request: Request):
+    data = await request.json()
+    upload_id = data.get("upload_id")
+    file_path, _ = assets.lookup(upload_id) if upload_id else (None, None)
+    file_path = file_path or data.get("file_path")
+    try:
+        # Resolved in the worker, so the server process never imports the text backend
+        body, shape, vocab_size = await run_in_pool("text", registry.call, "utils.token_ids:encode_file_to_npz",
+                                                    file_path, data.get("steps", []), data.get("vocab", "default"),
+                                                    not data.get("freeze_vocab", False), data.get("max_length"),
+                                                    data.get("bucket"))
+    except QueueFullError:
+        return busy_response("text")
+    except Exception as e:
+        return JSONResponse({"output": f"Error: {str(e)}", "file_type": "text"}, status_code=400)
+
+    # An .npz with an int32 "ids" matrix and a "lengths" vector
+    if data.get("output_format") == "binary":
+        return Response(content=body, media_type="application/x-npz")
+    url = await run_in_threadpool(store_result, body, "application/x-npz")
+    return JSONResponse({"output": url, "file_type": "text",
+                         "shape": shape, "vocab_size": vocab_size})
+
+@app.post("/stream_audio/")
+async def stream_audio(request: Request):
+    data = await request.json()
+    upload_id = data.get("upload_id")
+    file_path, _ = assets.lookup(upload_id) if upload_id else (None, None)
+    file_path = file_path or data.get("file_path")
+    steps = data.get("steps", [])
+    try:
+        # Audio is read, processed and sent block by block on the op threads, in constant memory
+        chunks = await stream_in_pool(registry.call, "utils.audio_stream:iter_wav_chunks", file_path, steps)
+    except QueueFullError:
+        return busy_response("audio")
+    except (ValueError, TypeError, OSError, RuntimeError) as e:
+        # soundfile raises RuntimeError (LibsndfileError) for files it cannot parse
+        return JSONResponse({"output": f"Error: {str(e)}", "file_type": "audio"}, status_code=400)
+    except Exception as e:
+        return JSONResponse({"output": f"Error: {str(e)}", "file_type": "audio"}, status_code=500)
+
+    return StreamingResponse(chunks, media_type="audio/wav")
+
+@app.post("/augment_3d_batch/")
+async def augment_3d_batch(request: Request):
+    data = await request.json()
+    upload_id = data.get("upload_id")
+    file_path, _ = assets.lookup(upload_id) if upload_id else (None, None)
+    file_path = file_path or data.get("file_path")
+    options = data.get("options", ["Rotation"])
+    k = data.get("k", 8)
+    if not isinstance(k, int) or isinstance(k, bool) or not 0 < k <= MAX_3D_BATCH_K:
+        return JSONResponse({"output": f"Error: k must be an integer between 1 and {MAX_3D_BATCH_K}",
+                             "file_type": "3d"}, status_code=400)
+    output_format = data.get("format", "npz")
+    if output_format not in ("npz", "off", "ply"):
+        return JSONResponse({"output": f"Error: unsupported format {output_format}", "file_type": "3d"}, status_code=400)
+
+    try:
+        result = await run_in_pool("3d", registry.call, "utils.three_d_augmentation:augment_file_batch",
+                                   file_path, k, options, output_format)
+    except QueueFullError:
+        return busy_response("3d")
+    except ValueError as e:
+        # k copies of this mesh exceed MAX_3D_BATCH_VERTICES
+        return JSONResponse({"output": f"Error: {str(e)}", "file_type": "3d"}, status_code=400)
+    if isinstance(result, str):
+        return JSONResponse({"output": result, "file_type": "3d"})
+    # Stored in the bounded results directory, like every other binary result
+    urls = [await run_in_threadpool(store_result, body, media_type) for body, media_type in result]
+    return JSONResponse({"output": urls, "file_type": "3d"})
+
+@app.post("/batch/")
+async def start_batch(request: Request):
+    data = await request.json()
+    source = data.get("source")
+    output_dir = data.get("output_dir")
+    steps = data.get("steps", [])
+    if not source or not output_dir:
+        return JSONResponse({"error": "source and output_dir are required"}, status_code=400)
+
+    try:
+        job_id = start_job(source, output_dir, steps, data.get("file_type"), data.get("workers"))
+    except (ValueError, TypeError) as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except TooManyJobsError as e:
+        return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "60"})
+    return JSONResponse({"job_id": job_id})
+
+@app.get("/batch/{job_id}")
+async def batch_status(job_id: str):
+    progress = batch_jobs.get(job_id)
+    if progress is None:
+        return JSONResponse({"error": "Unknown job"}, status_code=404)
+    return JSONResponse(progress)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    try:
+        # Text ops run in worker processes, each with its own stem/lemma caches: this reports
+        # whichever worker picks the job up (its pid is included), not a total over all workers
+        word_cache = await run_in_pool("text", registry.call, "utils.text_processing:word_cache_report")
+    except QueueFullError:
+        word_cache = None
+    # Only report the audio transform cache if audio has been used in this process
+    audio_transforms = sys.modules.get("utils.audio_transforms")
+    return JSONResponse({**result_cache.report(), "assets": assets.report(),
+                         "audio_transforms": audio_transforms.report() if audio_transforms else None,
+                         "word_cache": word_cache})
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Per-phase durations, input and output sizes, errors and request latencies, for Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/profile/start")
+async def start_profile(request: Request):
+    """Start the sampling profiler; optional JSON body {"interval": seconds}."""
+    data = await request.json() if await request.body() else {}
+    interval = data.get("interval")
+    if interval is not None:
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            interval = None
+        if interval is None or not 0 < interval < float("inf"):
+            return JSONResponse({"error": "interval must be a positive number of seconds"}, status_code=400)
+    started = profiler.start(interval)
+    return JSONResponse({**profiler.report(), "started": started})
+
+@app.post("/profile/stop")
+async def stop_profile():
+    """Stop the profiler and return the collapsed stacks (for flamegraph.pl or speedscope)."""
+    return PlainTextResponse(profiler.stop())
+
+@app.get("/profile")
+async def profile_status():
+    return JSONResponse(profiler.report())
 
-    return JSONResponse({"output": result, "file_type": file_type})
+@app.get("/modalities")
+async def modality_report():
+    """Startup time, memory and the load cost of each modality backend, for the server and a text worker."""
+    try:
+        worker = await run_in_pool("text", registry.report)
+    except QueueFullError:
+        worker = None
+    return JSONResponse({"server": registry.report(), "text_worker": worker})
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,42 @@
+"""Block-by-block resampling in utils/audio_stream.py against resampling the whole signal at once."""
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+pytest.importorskip("soundfile")
+
+from utils import audio_stream, audio_transforms
+
+
+def one_shot(signal, sample_rate, target_sr):
+    waveform = torch.from_numpy(np.ascontiguousarray(signal.T))
+    return audio_transforms.resample(waveform, sample_rate, target_sr).numpy().T
+
+
+def streamed(signal, sample_rate, target_sr, block_frames):
+    blocks = (signal[start:start + block_frames] for start in range(0, len(signal), block_frames))
+    blocks, rate, frames = audio_stream.resample_blocks(blocks, sample_rate, len(signal), target_sr)
+    output = np.concatenate(list(blocks))
+    assert rate == target_sr
+    assert frames == len(output)
+    return output
+
+
+@pytest.mark.parametrize("sample_rate,target_sr", [(44100, 16000), (48000, 16000), (16000, 22050)])
+@pytest.mark.parametrize("block_frames", [100, 4096, 65536])
+def test_block_resampling_matches_one_shot(sample_rate, target_sr, block_frames):
+    rng = np.random.default_rng(0)
+    signal = rng.uniform(-0.5, 0.5, size=(sample_rate // 2 + 37, 2)).astype(np.float32)
+
+    expected = one_shot(signal, sample_rate, target_sr)
+    output = streamed(signal, sample_rate, target_sr, block_frames)
+    assert output.shape == expected.shape
+    np.testing.assert_allclose(output, expected, atol=1e-5)
+
+
+def test_same_rate_passes_blocks_through():
+    signal = np.zeros((1000, 1), dtype=np.float32)
+    blocks, rate, frames = audio_stream.resample_blocks(iter([signal]), 16000, 1000, 16000)
+    assert (rate, frames) == (16000, 1000)
+    assert next(blocks) is signal
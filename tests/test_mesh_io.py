@@ -0,0 +1,115 @@
+"""Round trips through the vectorized OFF, PLY and NPZ reader and writer in utils/mesh_io.py."""
+import numpy as np
+import pytest
+
+from utils import mesh_io
+
+VERTICES = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 1.0, 0.0], [0.0, 1.0, 0.0],
+                     [0.5, 0.5, 1.0 / 3.0]])
+TRIANGLES = np.array([[0, 1, 4], [1, 2, 4], [2, 3, 4], [3, 0, 4]])
+QUAD_OFF = """OFF
+4 1 0
+0 0 0
+1 0 0
+1 1 0
+0 1 0
+4 0 1 2 3
+"""
+
+
+def test_off_triangles_round_trip():
+    vertices, faces = mesh_io.parse_off(mesh_io.format_off(VERTICES, TRIANGLES))
+    np.testing.assert_array_equal(vertices, VERTICES)
+    np.testing.assert_array_equal(faces, TRIANGLES)
+    assert faces.dtype == np.int64
+
+
+def test_off_quads_are_fan_triangulated():
+    vertices, faces = mesh_io.parse_off(QUAD_OFF)
+    np.testing.assert_array_equal(vertices, VERTICES[:4])
+    np.testing.assert_array_equal(faces, [[0, 1, 2], [0, 2, 3]])
+
+
+def test_off_mixed_triangles_and_quads():
+    mixed = [[0, 1, 2, 3], [0, 1, 4], [1, 2, 4]]
+    data = mesh_io.format_off(VERTICES, np.array(mixed, dtype=object))
+    assert b"\n4 0 1 2 3\n3 0 1 4\n" in data
+    vertices, faces = mesh_io.parse_off(data)
+    np.testing.assert_array_equal(vertices, VERTICES)
+    np.testing.assert_array_equal(faces, [[0, 1, 2], [0, 2, 3], [0, 1, 4], [1, 2, 4]])
+
+
+@pytest.mark.parametrize("header", ["OFF 4 1 0", "OFF4 1 0"])
+def test_off_counts_on_header_line(header):
+    data = QUAD_OFF.replace("OFF\n4 1 0", header)
+    vertices, faces = mesh_io.parse_off(data)
+    assert vertices.shape == (4, 3)
+    np.testing.assert_array_equal(faces, [[0, 1, 2], [0, 2, 3]])
+
+
+@pytest.mark.parametrize("colors", ["255 0 0", "0.5 0.25 1.0 0.8"])
+def test_off_faces_with_trailing_colors(colors):
+    data = f"""OFF
+# a comment line
+5 2 0
+0 0 0
+1 0 0
+1 1 0
+0 1 0
+0.5 0.5 0.3  # trailing comment
+3 0 1 4 {colors}
+4 0 1 2 3 {colors}
+"""
+    vertices, faces = mesh_io.parse_off(data)
+    assert vertices.shape == (5, 3)
+    np.testing.assert_array_equal(faces, [[0, 1, 4], [0, 1, 2], [0, 2, 3]])
+
+
+def test_off_rejects_bad_header():
+    with pytest.raises(ValueError):
+        mesh_io.parse_off("PLY\n0 0 0\n")
+
+
+def test_binary_ply_round_trip(tmp_path):
+    path = mesh_io.save_mesh(VERTICES, TRIANGLES, str(tmp_path / "mesh.ply"))
+    vertices, faces = mesh_io.load_mesh(path)
+    np.testing.assert_allclose(vertices, VERTICES, rtol=1e-7)
+    np.testing.assert_array_equal(faces, TRIANGLES)
+    with open(path, "rb") as f:
+        assert f.read() == mesh_io.format_ply(VERTICES, TRIANGLES)
+
+
+def test_binary_ply_with_extra_properties(tmp_path):
+    # Exporters often add per-vertex colors and use other list types for the faces
+    header = ("ply\nformat binary_little_endian 1.0\ncomment exported elsewhere\n"
+              f"element vertex {len(VERTICES)}\n"
+              "property double x\nproperty double y\nproperty double z\n"
+              "property uchar red\nproperty uchar green\nproperty uchar blue\n"
+              f"element face {len(TRIANGLES)}\n"
+              "property list uint8 uint32 vertex_indices\nend_header\n")
+    vertex_records = np.zeros(len(VERTICES), dtype=[("x", "<f8"), ("y", "<f8"), ("z", "<f8"),
+                                                    ("red", "u1"), ("green", "u1"), ("blue", "u1")])
+    vertex_records["x"], vertex_records["y"], vertex_records["z"] = VERTICES.T
+    face_records = np.zeros(len(TRIANGLES), dtype=[("count", "u1"), ("indices", "<u4", (3,))])
+    face_records["count"], face_records["indices"] = 3, TRIANGLES
+    path = tmp_path / "colored.ply"
+    path.write_bytes(header.encode("ascii") + vertex_records.tobytes() + face_records.tobytes())
+
+    vertices, faces = mesh_io.load_ply(str(path))
+    np.testing.assert_array_equal(vertices, VERTICES)
+    np.testing.assert_array_equal(faces, TRIANGLES)
+
+
+def test_ascii_ply_is_rejected(tmp_path):
+    path = tmp_path / "ascii.ply"
+    path.write_bytes(b"ply\nformat ascii 1.0\nelement vertex 0\nend_header\n")
+    with pytest.raises(ValueError):
+        mesh_io.load_ply(str(path))
+
+
+def test_npz_round_trip(tmp_path):
+    path = mesh_io.save_mesh(VERTICES, TRIANGLES, str(tmp_path / "mesh.npz"))
+    vertices, faces = mesh_io.load_mesh(path)
+    np.testing.assert_array_equal(vertices, VERTICES)
+    np.testing.assert_array_equal(faces, TRIANGLES)
+    assert path.endswith(".npz")
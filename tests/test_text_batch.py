@@ -0,0 +1,78 @@
+"""The vectorized corpus ops in utils/text_batch.py against per-line references drawing the same random numbers."""
+import numpy as np
+import pytest
+
+from utils import text_batch
+
+LINES = [
+    "the quick brown fox jumps over the lazy dog",
+    "",
+    "hello",
+    "a b",
+    "one two three two one",
+    "  spaced   out   words  ",
+]
+SYNONYMS = {"quick": "fast", "dog": "hound", "two": "2", "hello": "hi", "words": "terms"}
+
+
+def run_batch(op, seed, *args, **kwargs):
+    tokens, offsets, vocab = text_batch.encode_corpus(LINES)
+    result = op(tokens, offsets, *args, rng=np.random.default_rng(seed), **kwargs)
+    if len(result) == 3:
+        tokens, offsets, vocab = result
+    else:
+        tokens, offsets = result
+    return text_batch.decode_corpus(tokens, offsets, vocab)
+
+
+def test_encode_decode_round_trip():
+    tokens, offsets, vocab = text_batch.encode_corpus(LINES)
+    assert tokens.dtype == np.int32
+    assert text_batch.decode_corpus(tokens, offsets, vocab) == [' '.join(line.split()) for line in LINES]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_deletion_matches_per_line(seed):
+    split = [line.split() for line in LINES]
+    draws = iter(np.random.default_rng(seed).random(sum(len(words) for words in split)))
+    expected = [' '.join(word for word in words if next(draws) > 0.3) for words in split]
+    assert run_batch(text_batch.random_deletion_batch, seed, deletion_prob=0.3) == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_swap_matches_per_line(seed):
+    split = [line.split() for line in LINES]
+    eligible = [words for words in split if len(words) >= 2]
+    rng = np.random.default_rng(seed)
+    firsts, seconds = rng.random(len(eligible)), rng.random(len(eligible))
+    for words, u, v in zip(eligible, firsts, seconds):
+        first, second = int(u * len(words)), int(v * (len(words) - 1))
+        second += second >= first
+        words[first], words[second] = words[second], words[first]
+    assert run_batch(text_batch.random_swap_batch, seed) == [' '.join(words) for words in split]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_insertion_matches_per_line(seed):
+    split = [line.split() for line in LINES]
+    non_empty = [words for words in split if words]
+    rng = np.random.default_rng(seed)
+    picks, positions = rng.random(len(non_empty)), rng.random(len(non_empty))
+    for words, u, v in zip(non_empty, picks, positions):
+        words.insert(int(v * (len(words) + 1)), words[int(u * len(words))])
+    assert run_batch(text_batch.random_insertion_batch, seed) == [' '.join(words) for words in split]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_synonym_replacement_matches_per_line(seed):
+    split = [line.split() for line in LINES]
+    non_empty = [words for words in split if words]
+    draws = iter(np.random.default_rng(seed).random(len(non_empty) * 2))
+    for words in non_empty:
+        picked = {words[int(next(draws) * len(words))] for _ in range(2)}
+        words[:] = [SYNONYMS.get(word, word) if word in picked else word for word in words]
+
+    tokens, offsets, vocab = text_batch.encode_corpus(LINES)
+    result = text_batch.synonym_replacement_batch(tokens, offsets, vocab, n=2, lookup=SYNONYMS.get,
+                                                  rng=np.random.default_rng(seed))
+    assert text_batch.decode_corpus(*result) == [' '.join(words) for words in split]
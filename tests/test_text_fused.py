@@ -0,0 +1,65 @@
+"""Fused token-level text steps (utils/text_fused.py) against running the *_lines ops one by one."""
+import pytest
+
+pytest.importorskip("nltk")
+
+from utils import registry, text_processing
+from utils.pipeline import PREPROCESS_OPS, TOKEN_OPS, fuse_ops
+
+LINES = [
+    "The Runners were RUNNING quickly, faster than 3 cars!",
+    "  Cats' toys: jumping & playing all day  ",
+    "",
+    "Short line",
+    "Generalizations about generously generated generators don't hold",
+]
+
+OPS = {**PREPROCESS_OPS["text"], "Noise Removal": "utils.text_processing:noise_removal_lines"}
+
+
+def chain(*steps):
+    return [(OPS[option], params) for option, params in steps]
+
+
+def run_ops(lines, ops):
+    for op, params in ops:
+        lines = registry.resolve(op)(lines, **(params or {}))
+    return lines
+
+
+@pytest.mark.parametrize("steps", [
+    [("Lowercase", {}), ("Noise Removal", {}), ("Stemming", {}), ("Padding/Truncating", {"max_length": 6})],
+    [("Lowercase", {}), ("Noise Removal", {}), ("Stemming", {}), ("Padding/Truncating", {})],
+    [("Lowercase", {}), ("Lowercase", {}), ("Noise Removal", {}),
+     ("Padding/Truncating", {"max_length": 4, "pad_token": "<pad>"})],
+    [("Noise Removal", {}), ("Stemming", {}), ("Lowercase", {})],
+])
+def test_fused_chain_matches_sequential(steps):
+    ops = chain(*steps)
+    fused = fuse_ops(ops)
+    assert len(fused) == 1 and fused[0][0] == "utils.text_fused:fused_lines"
+    assert run_ops(LINES, fused) == run_ops(LINES, ops)
+
+
+def test_tokenize_after_lowercase_matches_sequential():
+    pytest.importorskip("torchtext")
+    ops = chain(("Lowercase", {}), ("Tokenize", {}), ("Stemming", {}), ("Padding/Truncating", {"max_length": 8}))
+    fused = fuse_ops(ops)
+    assert len(fused) == 1
+    assert run_ops(LINES, fused) == run_ops(LINES, ops)
+
+
+def test_tokenizer_boundary_splits_the_run():
+    # Tokenize only commutes with Lowercase, so a Stemming step before it starts a new run
+    ops = chain(("Lowercase", {}), ("Stemming", {}), ("Tokenize", {}), ("Lowercase", {}))
+    fused = fuse_ops(ops)
+    assert [op for op, _ in fused] == ["utils.text_fused:fused_lines", "utils.text_fused:fused_lines"]
+    assert [TOKEN_OPS[op] for op, _ in ops[:2]] == [step["option"] for step in fused[0][1]["steps"]]
+    assert fused[1][1]["tokenizer"] == "basic_english"
+
+
+def test_padding_ends_a_run():
+    ops = chain(("Padding/Truncating", {"max_length": 3}), ("Lowercase", {}), ("Stemming", {}))
+    fused = fuse_ops(ops)
+    assert fused[0] == ops[0]
+    assert run_ops(LINES, fused) == run_ops(LINES, ops)
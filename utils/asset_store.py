@@ -0,0 +1,94 @@
+import os
+import sys
+import uuid
+
+import numpy as np
+
+from utils.cache import ByteLRU
+
+# Memory for decoded assets and how long an unused asset is kept
+ASSET_STORE_BYTES = int(os.environ.get("ASSET_STORE_BYTES", 1024 * 1024 * 1024))
+ASSET_TTL = float(os.environ.get("ASSET_TTL", 30 * 60))
+# Number of upload ids remembered (only their file path and type)
+MAX_UPLOADS = 100000
+
+
+def asset_size(data):
+    """Approximate memory held by a decoded asset."""
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    # Only audio decodes to tensors; don't import torch just to check for one
+    torch = sys.modules.get("torch")
+    if torch is not None and isinstance(data, torch.Tensor):
+        return data.element_size() * data.nelement()
+    if isinstance(data, (tuple, list)):
+        return sum(asset_size(item) for item in data)
+    if isinstance(data, (str, bytes)):
+        return len(data)
+    return 64
+
+
+def freeze(data):
+    """Mark decoded arrays read-only so an op can't modify the shared copy in place."""
+    if isinstance(data, np.ndarray):
+        data.flags.writeable = False
+    elif isinstance(data, tuple):
+        for item in data:
+            freeze(item)
+    return data
+
+
+class AssetStore:
+    """
+    Decoded inputs keyed by an opaque upload id, so repeated ops on one upload
+    skip `cv2.imread`, `torchaudio.load` and `trimesh.load`. Decoding happens on
+    first use; entries are evicted by size (LRU) and after ASSET_TTL seconds unused.
+    The key also holds the file's mtime and size, so a later upload that
+    overwrites the same path is decoded afresh instead of served stale.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.uploads = ByteLRU(MAX_UPLOADS, sizeof=lambda upload: 1, ttl=ttl)
+        self.decoded = ByteLRU(max_bytes, sizeof=asset_size, ttl=ttl)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def register(self, file_path, file_type):
+        """Remember an uploaded file and return its upload id."""
+        upload_id = uuid.uuid4().hex
+        self.uploads.put(upload_id, (file_path, file_type))
+        return upload_id
+
+    def lookup(self, upload_id):
+        """Return (file_path, file_type) for an upload id, or (None, None) if unknown or expired."""
+        return self.uploads.get(upload_id, (None, None))
+
+    def load(self, file_path, file_type, loader, upload_id=None):
+        """Return the decoded asset, decoding with `loader` only if it is not held yet."""
+        key = None
+        if upload_id is not None:
+            try:
+                stat = os.stat(file_path)
+                key = (upload_id, stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                pass
+        if key is not None:
+            data = self.decoded.get(key)
+            if data is not None:
+                self.stats["hits"] += 1
+                return data
+        self.stats["misses"] += 1
+        data = loader(file_path)
+        if key is not None:
+            self.decoded.put(key, freeze(data))
+        return data
+
+    def report(self):
+        return {
+            **self.stats,
+            "uploads": len(self.uploads),
+            "decoded_assets": len(self.decoded),
+            "decoded_bytes": self.decoded.total_bytes,
+        }
+
+
+assets = AssetStore(ASSET_STORE_BYTES, ASSET_TTL)
@@ -0,0 +1,128 @@
+"""
+Batched audio ops over zero-padded (B, C, T) waveform tensors.
+
+Clips of different lengths are padded to a common length and carried with a
+(B,) tensor of their true lengths; every op works on the whole batch with
+per-clip random parameters and keeps the padding at zero. Sorting clips into
+length buckets first (`bucket_batches`) keeps the padding small.
+"""
+import torch
+import torchaudio
+
+from utils import audio_transforms
+
+
+def load_clip(file_path, target_sr=16000, mono=True):
+    waveform, sample_rate = torchaudio.load(file_path)
+    if mono and waveform.shape[0] > 1:
+        waveform = waveform.mean(dim=0, keepdim=True)
+    return audio_transforms.resample(waveform, sample_rate, target_sr)
+
+
+def pad_batch(waveforms):
+    """Stack (C, T_i) waveforms into a zero-padded (B, C, max T) batch and a (B,) length tensor."""
+    lengths = torch.tensor([waveform.shape[-1] for waveform in waveforms])
+    batch = torch.zeros(len(waveforms), waveforms[0].shape[0], int(lengths.max()))
+    for i, waveform in enumerate(waveforms):
+        batch[i, :, :waveform.shape[-1]] = waveform
+    return batch, lengths
+
+
+def unpad_batch(batch, lengths):
+    """Split a padded batch back into a list of (C, T_i) waveforms."""
+    return [batch[i, :, :int(length)] for i, length in enumerate(lengths)]
+
+
+def load_batch(file_paths, target_sr=16000, mono=True):
+    """Load clips at a common sample rate into (batch, lengths)."""
+    return pad_batch([load_clip(file_path, target_sr, mono) for file_path in file_paths])
+
+
+def bucket_batches(waveforms, batch_size):
+    """
+    Group clips of similar length: yields (indices, batch, lengths) for batches
+    of up to `batch_size` clips taken in order of length.
+    """
+    order = sorted(range(len(waveforms)), key=lambda i: waveforms[i].shape[-1])
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        yield (indices, *pad_batch([waveforms[i] for i in indices]))
+
+
+def length_mask(batch, lengths):
+    """(B, 1, T) mask that is 1 inside each clip and 0 over its padding."""
+    steps = torch.arange(batch.shape[-1], device=batch.device)
+    return (steps[None, :] < lengths.to(batch.device)[:, None]).unsqueeze(1).to(batch.dtype)
+
+
+def _peak(batch):
+    """Per-clip maximum absolute value, shaped (B, 1, 1) for broadcasting."""
+    return batch.abs().amax(dim=(1, 2), keepdim=True)
+
+
+def normalize_batch(batch, lengths):
+    """Scale each clip by its own peak (padding is zero and does not change the peak)."""
+    return batch / _peak(batch).clamp_min(1e-12)
+
+
+def compress_batch(batch, lengths, threshold=-20, ratio=4):
+    """Dynamic range compression as `compress_waveform`, applied to every clip at once."""
+    threshold_linear = 10 ** (threshold / 20)
+    compressed = torch.where(batch > threshold_linear,
+                             threshold_linear + (batch - threshold_linear) / ratio,
+                             batch)
+    return compressed / _peak(compressed).clamp_min(1e-12)
+
+
+def add_noise_batch(batch, lengths, noise_factor=0.005, generator=None):
+    """Add Gaussian noise inside each clip, leaving the padding silent."""
+    noise = torch.randn(batch.shape, generator=generator, device=batch.device, dtype=batch.dtype)
+    return batch + noise_factor * noise * length_mask(batch, lengths)
+
+
+def random_volume_adjustment_batch(batch, lengths, factor_range=(0.5, 1.5), generator=None):
+    """Scale each clip by its own random factor."""
+    low, high = factor_range
+    factors = low + (high - low) * torch.rand(len(batch), 1, 1, generator=generator)
+    return batch * factors.to(batch.device, batch.dtype)
+
+
+def time_shift_batch(batch, lengths, shift_limit=0.2, generator=None):
+    """
+    Roll each clip by its own random shift of up to `shift_limit` of its length,
+    wrapping around within the clip (as `torch.roll` does) rather than the padded length.
+    """
+    lengths = lengths.to(batch.device)
+    limits = (lengths * shift_limit).long()
+    shifts = (torch.rand(len(batch), generator=generator).to(batch.device) * (2 * limits + 1)).long() - limits
+    steps = torch.arange(batch.shape[-1], device=batch.device)
+    index = (steps[None, :] - shifts[:, None]) % lengths[:, None].clamp_min(1)
+    shifted = torch.gather(batch, 2, index[:, None, :].expand_as(batch))
+    return shifted * length_mask(batch, lengths)
+
+
+BATCH_OPS = {
+    "Normalization": normalize_batch,
+    "Dynamic Range Compression": compress_batch,
+    "Random Noise Addition": add_noise_batch,
+    "Random Volume Adjustment": random_volume_adjustment_batch,
+    "Time Shifting": time_shift_batch,
+}
+
+# Ops that draw random parameters and take a `generator`
+RANDOM_OPS = {add_noise_batch, random_volume_adjustment_batch, time_shift_batch}
+
+
+def augment_batch(batch, lengths, options, seed=None):
+    """Apply the options in order to a padded batch; returns the new batch (lengths are unchanged)."""
+    for option in options:
+        if option not in BATCH_OPS:
+            raise ValueError(f"Invalid option selected: {option}")
+    generator = torch.Generator().manual_seed(seed) if seed is not None else None
+    for option in options:
+        op = BATCH_OPS[option]
+        if op in RANDOM_OPS:
+            batch = op(batch, lengths, generator=generator)
+        else:
+            batch = op(batch, lengths)
+    return batch
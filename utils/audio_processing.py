@@ -1,18 +1,18 @@
 import torchaudio
-import torchaudio.transforms as T
 import torch
-import random
-import base64
 import io
 
+from utils import audio_transforms
+
+def resample_waveform(waveform, sample_rate, target_sr=16000):
+    """Resampling: Standardizes the sample rate of a waveform."""
+    return audio_transforms.resample(waveform, sample_rate, target_sr), target_sr
+
 def load_audio(file_path, target_sr=16000):
     waveform, sample_rate = torchaudio.load(file_path)
-    if sample_rate != target_sr:
-        resampler = T.Resample(orig_freq=sample_rate, new_freq=target_sr)
-        waveform = resampler(waveform)
-    return waveform, target_sr
+    return resample_waveform(waveform, sample_rate, target_sr)
 
-def audio_to_base64(waveform, sample_rate=16000):
+def audio_to_bytes(waveform, sample_rate=16000):
     # Ensure waveform is 2D and float32
     if waveform.ndim == 1:
         waveform = waveform.unsqueeze(0)
@@ -21,16 +21,10 @@ def audio_to_base64(waveform, sample_rate=16000):
     # Save waveform to an in-memory bytes buffer
     buffer = io.BytesIO()
     torchaudio.save(buffer, waveform, sample_rate=sample_rate, format="wav")
-    
-    # Convert buffer to base64
-    buffer.seek(0)
-    audio_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-    return audio_base64
+    return buffer.getvalue()
 
-def compress(audio_file, threshold=-20, ratio=4):
+def compress_waveform(waveform, sample_rate, threshold=-20, ratio=4):
     """Dynamic Range Compression: Reduces the volume of loud sounds."""
-    waveform, sample_rate = load_audio(audio_file)
-
     # Convert threshold from dB to linear scale
     threshold_linear = 10 ** (threshold / 20)
 
@@ -45,34 +39,40 @@ def compress(audio_file, threshold=-20, ratio=4):
 
     # Ensure that the output does not exceed 1.0
     compressed_waveform = gain_reduction / torch.max(gain_reduction.abs())
+    return compressed_waveform, sample_rate
+
+def normalize_waveform(waveform, sample_rate):
+    """ Normalization: Adjusts the amplitude to avoid clipping or extreme values."""
+    # Normalize by the maximum absolute value
+    return waveform / waveform.abs().max(), sample_rate
+
+def trim_silence_waveform(waveform, sample_rate, top_db=20):
+    """Trimming Silence: Removes silence from the start and end."""
+    # Down-mix to mono if stereo
+    if waveform.shape[0] > 1:
+        waveform = waveform.mean(dim=0, keepdim=True)
+
+    # Use Voice Activity Detection (VAD) to trim silence
+    return audio_transforms.get_vad(sample_rate)(waveform), sample_rate
 
-    return audio_to_base64(compressed_waveform, sample_rate)
+def compress(audio_file, threshold=-20, ratio=4):
+    """Dynamic Range Compression: Reduces the volume of loud sounds."""
+    waveform, sample_rate = load_audio(audio_file)
+    return compress_waveform(waveform, sample_rate, threshold, ratio)
 
 # Resampling
 def resample(audio_file, target_sr=16000):
     """Resampling: Standardizes the sample rate across files."""
-    waveform, sample_rate = load_audio(audio_file, target_sr)
-    return audio_to_base64(waveform, sample_rate)
+    return load_audio(audio_file, target_sr)
 
 # Normalization
 def normalize(audio_file):
     """ Normalization: Adjusts the amplitude to avoid clipping or extreme values."""
     waveform, sample_rate = load_audio(audio_file)
-    
-    # Normalize by the maximum absolute value
-    normalized_waveform = waveform / waveform.abs().max()
-    return audio_to_base64(normalized_waveform, sample_rate)
+    return normalize_waveform(waveform, sample_rate)
 
 # Trimming Silence
 def trim_silence(audio_file, top_db=20):
     """Trimming Silence: Removes silence from the start and end."""
     waveform, sample_rate = load_audio(audio_file)
-    
-    # Down-mix to mono if stereo
-    if waveform.shape[0] > 1:
-        waveform = waveform.mean(dim=0, keepdim=True)
-
-    # Use Voice Activity Detection (VAD) to trim silence
-    trimmed_waveform = T.Vad(sample_rate=sample_rate)(waveform)
-    
-    return audio_to_base64(trimmed_waveform, sample_rate)
+    return trim_silence_waveform(waveform, sample_rate, top_db)
@@ -0,0 +1,90 @@
+"""
+STFT-domain audio engine.
+
+Time stretching, pitch shifting and SpecAugment-style masking all work on the
+spectrogram. Here they share one complex STFT: the stretch and pitch factors
+are folded into a single phase-vocoder rate, masks are applied to the same
+spectrogram, and the waveform is rebuilt once with `istft`. Keeping the phase
+avoids the Griffin-Lim reconstruction and its artifacts.
+"""
+import math
+
+import torch
+import torchaudio.functional as F
+
+from utils import audio_transforms
+
+N_FFT = 1024
+HOP_LENGTH = 256
+
+
+def _mask(spec, count, width, axis):
+    """Zero `count` random bands of up to `width` bins along `axis` (-2 frequency, -1 time)."""
+    size = spec.shape[axis]
+    for _ in range(count):
+        band = int(torch.randint(0, min(width, size) + 1, (1,)))
+        start = int(torch.randint(0, size - band + 1, (1,)))
+        spec.narrow(axis, start, band).zero_()
+    return spec
+
+
+def transform_waveform(waveform, sample_rate, rate=1.0, n_steps=0.0, freq_masks=0, freq_mask_width=27,
+                       time_masks=0, time_mask_width=40, mono=False, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """
+    Stretch by `rate` (> 1 is faster), shift the pitch by `n_steps` semitones and
+    apply frequency/time masks, with one STFT and one inverse STFT.
+
+    Pitch shifting is done as in `T.PitchShift`: stretch by 2 ** (-n_steps / 12),
+    then resample so the duration is restored and the pitch moves.
+    """
+    if mono and waveform.shape[0] > 1:
+        waveform = waveform.mean(dim=0, keepdim=True)
+    pitch_rate = 2.0 ** (-n_steps / 12)
+    total_rate = rate * pitch_rate
+
+    window = audio_transforms.get_window(n_fft).to(waveform.device)
+    spec = torch.stft(waveform, n_fft, hop_length, window=window, return_complex=True)
+    if total_rate != 1.0:
+        phase_advance = audio_transforms.get_phase_advance(spec.shape[-2], hop_length).to(spec.device)
+        spec = F.phase_vocoder(spec, total_rate, phase_advance)
+    _mask(spec, freq_masks, freq_mask_width, -2)
+    _mask(spec, time_masks, time_mask_width, -1)
+
+    n_samples = waveform.shape[-1]
+    waveform = torch.istft(spec, n_fft, hop_length, window=window, length=int(round(n_samples / total_rate)))
+
+    if n_steps:
+        # Round the source rate to a multiple of gcd(sample_rate, 100) so the
+        # resampling kernel stays small; the pitch error is a few cents
+        step = math.gcd(int(sample_rate), 100)
+        orig_freq = int(round(sample_rate / pitch_rate / step)) * step
+        waveform = audio_transforms.resample(waveform, orig_freq, sample_rate)
+        length = int(round(n_samples / rate))
+        if waveform.shape[-1] >= length:
+            waveform = waveform[..., :length]
+        else:
+            waveform = torch.nn.functional.pad(waveform, (0, length - waveform.shape[-1]))
+    return waveform, sample_rate
+
+
+def combine_steps(steps):
+    """
+    Merge consecutive ("time_stretch" | "pitch_shift" | "spec_augment", params)
+    steps into one set of `transform_waveform` arguments.
+    """
+    kwargs = {"rate": 1.0, "n_steps": 0.0, "freq_masks": 0, "time_masks": 0, "mono": False}
+    for kind, params in steps:
+        if kind == "time_stretch":
+            kwargs["rate"] *= params["rate"]
+            kwargs["mono"] = True
+        elif kind == "pitch_shift":
+            kwargs["n_steps"] += params["n_steps"]
+            kwargs["mono"] = True
+        elif kind == "spec_augment":
+            kwargs["freq_masks"] += params["freq_masks"]
+            kwargs["time_masks"] += params["time_masks"]
+            for width in ("freq_mask_width", "time_mask_width"):
+                kwargs[width] = max(kwargs.get(width, 0), params[width])
+        else:
+            raise ValueError(f"Unknown STFT step: {kind}")
+    return kwargs
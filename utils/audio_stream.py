@@ -0,0 +1,200 @@
+"""
+Streaming audio engine for long recordings.
+
+The file is read in fixed-size blocks with `soundfile`, every op transforms
+the block stream lazily, and the result is written as a WAV stream whose
+header is computed up front. Memory use depends on the block size, not on the
+duration of the recording.
+
+Usage:
+    python -m utils.audio_stream INPUT.wav OUTPUT.wav --steps '[{"option": "Resampling"}, {"option": "Random Volume Adjustment"}]'
+"""
+import argparse
+import itertools
+import json
+import math
+import random
+import struct
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from utils import audio_transforms
+
+# Frames read per block
+BLOCK_FRAMES = 65536
+# Taps on each side of the resampling kernel (torchaudio's default lowpass_filter_width)
+LOWPASS_FILTER_WIDTH = 6
+
+
+def iter_blocks(file_path, block_frames=BLOCK_FRAMES):
+    """Yield (frames, channels) float32 blocks of an audio file."""
+    with sf.SoundFile(file_path) as f:
+        for block in f.blocks(blocksize=block_frames, dtype='float32', always_2d=True):
+            yield block
+
+
+def scan_peak(file_path, block_frames=BLOCK_FRAMES):
+    """Maximum absolute sample value of a file, read block by block."""
+    peak = 0.0
+    for block in iter_blocks(file_path, block_frames):
+        peak = max(peak, float(np.abs(block).max(initial=0.0)))
+    return peak
+
+
+# Streaming ops take and return (blocks, sample_rate, frames)
+
+def volume_blocks(blocks, sample_rate, frames, factor_range=(0.5, 1.5)):
+    factor = random.uniform(*factor_range)
+    return (block * factor for block in blocks), sample_rate, frames
+
+
+def noise_blocks(blocks, sample_rate, frames, noise_factor=0.005):
+    def add_noise(blocks):
+        for block in blocks:
+            yield block + noise_factor * np.random.randn(*block.shape).astype(np.float32)
+    return add_noise(blocks), sample_rate, frames
+
+
+def normalize_blocks(blocks, sample_rate, frames, peak):
+    """Scale by the file's peak, found by `scan_peak` before streaming starts."""
+    scale = 1.0 / peak if peak > 0 else 1.0
+    return (block * scale for block in blocks), sample_rate, frames
+
+
+def compress_blocks(blocks, sample_rate, frames, threshold=-20, ratio=4):
+    """
+    Dynamic range compression as `compress_waveform`, except that the output is
+    scaled by the running peak seen so far rather than the peak of the whole file.
+    """
+    threshold_linear = 10 ** (threshold / 20)
+
+    def compress(blocks):
+        peak = 0.0
+        for block in blocks:
+            compressed = np.where(block > threshold_linear,
+                                  threshold_linear + (block - threshold_linear) / ratio,
+                                  block)
+            peak = max(peak, float(np.abs(compressed).max(initial=0.0)))
+            yield compressed / peak if peak > 0 else compressed
+    return compress(blocks), sample_rate, frames
+
+
+def resample_blocks(blocks, sample_rate, frames, target_sr=16000):
+    """
+    Resample a block stream with the cached torchaudio kernel. Input is fed in
+    multiples of the reduced source rate, with enough past and future samples
+    around each segment for the kernel, so the output matches resampling the
+    whole file in one go.
+    """
+    if sample_rate == target_sr:
+        return blocks, sample_rate, frames
+    gcd = math.gcd(int(sample_rate), int(target_sr))
+    orig, new = int(sample_rate) // gcd, int(target_sr) // gcd
+    width = math.ceil(LOWPASS_FILTER_WIDTH * orig / (min(orig, new) * 0.99))
+    # Context on each side, rounded up to whole kernel steps so segments stay aligned
+    context = orig * math.ceil((width + 1) / orig)
+    skip = context * new // orig
+
+    def resample(segment):
+        waveform = torch.from_numpy(np.ascontiguousarray(segment.T))
+        return audio_transforms.resample(waveform, sample_rate, target_sr).numpy().T
+
+    def stream(blocks):
+        history = pending = None
+        for block in blocks:
+            if history is None:
+                # Zeros before the start match the padding of a one-shot resample
+                history = np.zeros((context, block.shape[1]), dtype=np.float32)
+                pending = block[:0]
+            pending = np.concatenate([pending, block])
+            # Keep `context` samples of look-ahead; process the rest in whole kernel steps
+            n = (len(pending) - context) // orig * orig
+            if n <= 0:
+                continue
+            segment = np.concatenate([history, pending[:n + context]])
+            yield resample(segment)[skip:skip + n * new // orig]
+            history = np.concatenate([history, pending[:n]])[-context:]
+            pending = pending[n:]
+        if pending is not None and len(pending):
+            segment = np.concatenate([history, pending, np.zeros_like(history)])
+            yield resample(segment)[skip:skip + math.ceil(len(pending) * new / orig)]
+
+    return stream(blocks), target_sr, math.ceil(frames * new / orig)
+
+
+STREAM_OPS = {
+    "Resampling": resample_blocks,
+    "Normalization": normalize_blocks,
+    "Dynamic Range Compression": compress_blocks,
+    "Random Noise Addition": noise_blocks,
+    "Random Volume Adjustment": volume_blocks,
+}
+
+
+def check_steps(steps):
+    """Validate steps before any audio is read."""
+    for i, step in enumerate(steps):
+        option = step.get("option")
+        if option not in STREAM_OPS:
+            raise ValueError(f"Invalid option selected: {option}")
+        # The peak of later steps' output is only known after a full pass
+        if option == "Normalization" and i > 0:
+            raise ValueError("Normalization must be the first step when streaming")
+
+
+def stream_audio(file_path, steps, block_frames=BLOCK_FRAMES):
+    """Build the lazy block stream for `steps`; returns (blocks, sample_rate, frames, channels)."""
+    check_steps(steps)
+    info = sf.info(file_path)
+    blocks, sample_rate, frames = iter_blocks(file_path, block_frames), info.samplerate, info.frames
+    for step in steps:
+        option, params = step["option"], dict(step.get("params") or {})
+        if option == "Normalization":
+            params["peak"] = scan_peak(file_path, block_frames)
+        blocks, sample_rate, frames = STREAM_OPS[option](blocks, sample_rate, frames, **params)
+    return blocks, sample_rate, frames, info.channels
+
+
+def wav_header(sample_rate, channels, frames, bits=16):
+    """44-byte header of a PCM WAV file holding `frames` frames."""
+    block_align = channels * bits // 8
+    data_size = frames * block_align
+    return b''.join([
+        b'RIFF', struct.pack('<I', 36 + data_size), b'WAVE',
+        b'fmt ', struct.pack('<IHHIIHH', 16, 1, channels, sample_rate,
+                             sample_rate * block_align, block_align, bits),
+        b'data', struct.pack('<I', data_size),
+    ])
+
+
+def to_pcm16(block):
+    return (np.clip(block, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+
+def iter_wav_chunks(file_path, steps, block_frames=BLOCK_FRAMES):
+    """
+    Return a 16-bit PCM WAV file as an iterator of chunks: the header, then one
+    chunk per block. The steps are checked and the file opened and its header
+    parsed right away, so bad input raises here instead of cutting a response short.
+    """
+    blocks, sample_rate, frames, channels = stream_audio(file_path, steps, block_frames)
+    header = wav_header(int(sample_rate), channels, frames)
+    return itertools.chain([header], (to_pcm16(block) for block in blocks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a long recording through a chain of audio ops.")
+    parser.add_argument("input", help="Input audio file")
+    parser.add_argument("output", help="Output WAV file")
+    parser.add_argument("--steps", required=True, help="JSON list of steps")
+    args = parser.parse_args()
+
+    with open(args.output, 'wb') as output:
+        for chunk in iter_wav_chunks(args.input, json.loads(args.steps)):
+            output.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Pool of reusable audio transform objects.
+
+Building a `T.Resample` computes its sinc kernel, and `T.Vad` or an STFT
+window are rebuilt on every call otherwise. Transforms are stateless once
+built, so one instance per parameter set is cached and shared by all requests.
+"""
+from functools import lru_cache
+
+import torch
+import torchaudio.transforms as T
+
+# Sample-rate pairs built at startup, so the first request does not pay for them
+WARMUP_RESAMPLES = [(44100, 16000), (48000, 16000)]
+
+
+@lru_cache(maxsize=64)
+def get_resampler(orig_freq, new_freq):
+    return T.Resample(orig_freq=orig_freq, new_freq=new_freq)
+
+
+@lru_cache(maxsize=16)
+def get_vad(sample_rate):
+    return T.Vad(sample_rate=sample_rate)
+
+
+@lru_cache(maxsize=16)
+def get_window(n_fft):
+    return torch.hann_window(n_fft)
+
+
+@lru_cache(maxsize=16)
+def get_phase_advance(n_freq, hop_length):
+    return torch.linspace(0, torch.pi * hop_length, n_freq)[..., None]
+
+
+def resample(waveform, orig_freq, new_freq):
+    """Resample with the cached kernel for this pair of rates."""
+    orig_freq, new_freq = int(orig_freq), int(new_freq)
+    if orig_freq == new_freq:
+        return waveform
+    return get_resampler(orig_freq, new_freq)(waveform)
+
+
+def warm_up(pairs=WARMUP_RESAMPLES):
+    """Build (and run once) the resamplers for the common sample-rate pairs."""
+    for orig_freq, new_freq in pairs:
+        resample(torch.zeros(1, orig_freq // 10), orig_freq, new_freq)
+
+
+def report():
+    return {
+        name: func.cache_info()._asdict()
+        for name, func in [("resamplers", get_resampler), ("vad", get_vad),
+                           ("windows", get_window), ("phase_advance", get_phase_advance)]
+    }
@@ -0,0 +1,296 @@
+"""
+Apply a pipeline of preprocessing/augmentation steps to a whole dataset.
+
+Usage:
+    python -m utils.batch SOURCE OUTPUT_DIR --file-type image --steps '[{"option": "Resizing"}]'
+
+SOURCE is a directory, a glob pattern or a .tar/.tar.gz/.zip archive. Outputs
+mirror the input layout under OUTPUT_DIR. Each output is written to a temporary
+file and renamed into place, so an interrupted run can simply be restarted:
+items whose output already exists are skipped.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+
+from utils.pipeline import output_path_for
+
+EXTENSIONS = {
+    "text": {".txt"},
+    "image": {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"},
+    "audio": {".wav", ".mp3", ".flac", ".ogg"},
+    "3d": {".off"},
+}
+
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".zip")
+
+# Number of errors kept in the progress report
+MAX_REPORTED_ERRORS = 20
+
+# Jobs started through the API may only read and write below this directory
+BATCH_ROOT = os.environ.get("BATCH_ROOT", "batch")
+# API jobs running at once, worker processes per API job, and how long finished jobs stay pollable
+MAX_BATCH_JOBS = int(os.environ.get("MAX_BATCH_JOBS", 2))
+MAX_BATCH_WORKERS = int(os.environ.get("MAX_BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_JOB_TTL = float(os.environ.get("BATCH_JOB_TTL", 60 * 60))
+MAX_FINISHED_JOBS = 100
+
+
+class TooManyJobsError(Exception):
+    """Raised when MAX_BATCH_JOBS API jobs are already running."""
+
+
+def resolve_under(root, path):
+    """
+    Resolve `path` (relative to `root`, or absolute) and check that it stays
+    inside `root` after following symlinks; raises ValueError otherwise.
+    """
+    if not path or ".." in path.replace("\\", "/").split("/"):
+        raise ValueError(f"Invalid path: {path}")
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Path outside the batch root: {path}")
+    return resolved
+
+
+def detect_file_type(file_path):
+    """Guess the modality from the file extension."""
+    extension = os.path.splitext(file_path)[1].lower()
+    for file_type, extensions in EXTENSIONS.items():
+        if extension in extensions:
+            return file_type
+    return None
+
+
+def extract_archive(archive_path, output_dir):
+    """Extract a tar/zip archive next to the outputs; already extracted archives are reused."""
+    extract_dir = os.path.join(output_dir, ".inputs", os.path.basename(archive_path))
+    done_marker = os.path.join(extract_dir, ".extracted")
+    if not os.path.exists(done_marker):
+        os.makedirs(extract_dir, exist_ok=True)
+        if archive_path.endswith(".zip"):
+            with zipfile.ZipFile(archive_path) as archive:
+                archive.extractall(extract_dir)
+        else:
+            with tarfile.open(archive_path) as archive:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extractall(extract_dir, filter="data")
+                else:
+                    # No extraction filters on this Python: refuse links and members escaping extract_dir
+                    for member in archive.getmembers():
+                        if member.issym() or member.islnk():
+                            raise ValueError(f"Links are not allowed in archives: {member.name}")
+                        resolve_under(extract_dir, member.name)
+                    archive.extractall(extract_dir)
+        open(done_marker, "w").close()
+    return extract_dir
+
+
+def collect_inputs(source, output_dir, file_type=None, allowed_root=None):
+    """
+    Return (input_path, relative_path) pairs for every matching file in `source`.
+    With `allowed_root`, files that resolve outside it (e.g. through symlinks) are skipped.
+    """
+    if source.endswith(ARCHIVE_SUFFIXES) and os.path.isfile(source):
+        source = extract_archive(source, output_dir)
+
+    if os.path.isdir(source):
+        root = source
+        paths = []
+        for dirpath, _, filenames in os.walk(source):
+            paths.extend(os.path.join(dirpath, name) for name in filenames)
+    else:
+        root = os.path.dirname(source.split("*")[0]) or "."
+        paths = glob.glob(source, recursive=True)
+
+    items = []
+    for path in sorted(paths):
+        path_type = detect_file_type(path)
+        if path_type is None or (file_type and path_type != file_type):
+            continue
+        if allowed_root is not None and os.path.commonpath([allowed_root, os.path.realpath(path)]) != allowed_root:
+            continue
+        items.append((path, os.path.relpath(path, root)))
+    return items
+
+
+def _init_worker():
+    # One intra-op thread per worker: parallelism comes from the processes, and
+    # nested OpenCV/torch thread pools would oversubscribe the cores.
+    os.environ["OMP_NUM_THREADS"] = "1"
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except ImportError:
+        pass
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def process_item(task):
+    """Run the pipeline on one file; returns (relative_path, error or None)."""
+    from utils.pipeline import run_pipeline_to_file
+
+    input_path, relative_path, output_path, file_type, steps = task
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    root, extension = os.path.splitext(output_path)
+    tmp_path = f"{root}.tmp-{os.getpid()}{extension}"
+    try:
+        run_pipeline_to_file(input_path, file_type, steps, tmp_path)
+        os.replace(tmp_path, output_path)
+        return relative_path, None
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return relative_path, f"{type(e).__name__}: {str(e)}"
+
+
+def new_progress():
+    return {
+        "status": "pending",
+        "total": 0,
+        "done": 0,
+        "skipped": 0,
+        "failed": 0,
+        "files_per_second": 0.0,
+        "errors": [],
+        "finished_at": None,
+    }
+
+
+def run_batch(source, output_dir, steps, file_type=None, workers=None, progress=None, on_progress=None,
+              allowed_root=None):
+    """
+    Process every input file in parallel and write the results to `output_dir`.
+    `progress` is a dict updated in place (see `new_progress`) so callers can poll it.
+    With `allowed_root`, only input files inside that directory are processed.
+    """
+    progress = progress if progress is not None else new_progress()
+    progress["status"] = "running"
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = []
+    items = collect_inputs(source, output_dir, file_type, allowed_root)
+    progress["total"] = len(items)
+    for input_path, relative_path in items:
+        item_type = file_type or detect_file_type(input_path)
+        output_path = output_path_for(os.path.join(output_dir, relative_path), item_type)
+        # Resume: outputs are renamed into place only once complete
+        if os.path.exists(output_path):
+            progress["skipped"] += 1
+            continue
+        tasks.append((input_path, relative_path, output_path, item_type, steps))
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, min(64, len(tasks) // (workers * 8)))
+    start = time.time()
+    # Spawn rather than fork: forking a process that already runs torch threads can deadlock
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=_init_worker) as pool:
+        for relative_path, error in pool.imap_unordered(process_item, tasks, chunksize=chunksize):
+            if error is None:
+                progress["done"] += 1
+            else:
+                progress["failed"] += 1
+                if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+                    progress["errors"].append(f"{relative_path}: {error}")
+            elapsed = time.time() - start
+            progress["files_per_second"] = round((progress["done"] + progress["failed"]) / elapsed, 2) if elapsed else 0.0
+            if on_progress is not None:
+                on_progress(progress)
+
+    progress["status"] = "finished"
+    return progress
+
+
+# Batch jobs started through the API, keyed by job id
+jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def prune_jobs(now=None):
+    """Forget finished jobs older than BATCH_JOB_TTL, keeping at most MAX_FINISHED_JOBS of them."""
+    now = now or time.time()
+    with _jobs_lock:
+        finished = sorted((progress["finished_at"], job_id) for job_id, progress in jobs.items()
+                          if progress.get("finished_at") is not None)
+        for i, (finished_at, job_id) in enumerate(finished):
+            if now - finished_at > BATCH_JOB_TTL or i < len(finished) - MAX_FINISHED_JOBS:
+                del jobs[job_id]
+
+
+def start_job(source, output_dir, steps, file_type=None, workers=None):
+    """
+    Run a batch in a background thread and return its job id for polling.
+    `source` and `output_dir` are resolved under BATCH_ROOT (ValueError if they
+    leave it), `workers` is capped at MAX_BATCH_WORKERS, and TooManyJobsError
+    is raised while MAX_BATCH_JOBS jobs are running.
+    """
+    root = os.path.realpath(BATCH_ROOT)
+    source = resolve_under(root, source)
+    output_dir = resolve_under(root, output_dir)
+    workers = max(1, min(int(workers or MAX_BATCH_WORKERS), MAX_BATCH_WORKERS))
+
+    prune_jobs()
+    job_id = uuid.uuid4().hex
+    progress = new_progress()
+    with _jobs_lock:
+        running = sum(1 for job in jobs.values() if job.get("finished_at") is None)
+        if running >= MAX_BATCH_JOBS:
+            raise TooManyJobsError(f"{running} batch jobs already running, retry later")
+        jobs[job_id] = progress
+
+    def target():
+        try:
+            run_batch(source, output_dir, steps, file_type, workers, progress, allowed_root=root)
+        except Exception as e:
+            progress["status"] = "failed"
+            progress["errors"].append(f"{type(e).__name__}: {str(e)}")
+        finally:
+            progress["finished_at"] = time.time()
+
+    threading.Thread(target=target, name=f"batch-{job_id}", daemon=True).start()
+    return job_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a preprocessing/augmentation pipeline to a dataset.")
+    parser.add_argument("source", help="Directory, glob pattern or .tar/.zip archive")
+    parser.add_argument("output_dir", help="Directory the processed files are written to")
+    parser.add_argument("--file-type", choices=sorted(EXTENSIONS), help="Only process files of this modality")
+    steps_group = parser.add_mutually_exclusive_group(required=True)
+    steps_group.add_argument("--steps", help="JSON list of pipeline steps")
+    steps_group.add_argument("--steps-file", help="Path to a JSON file with the pipeline steps")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.steps_file:
+        with open(args.steps_file) as f:
+            steps = json.load(f)
+    else:
+        steps = json.loads(args.steps)
+
+    def report(progress):
+        finished = progress["done"] + progress["failed"] + progress["skipped"]
+        if finished % 100 == 0 or finished == progress["total"]:
+            print(f"[{finished}/{progress['total']}] done={progress['done']} skipped={progress['skipped']} "
+                  f"failed={progress['failed']} {progress['files_per_second']} files/s", flush=True)
+
+    progress = run_batch(args.source, args.output_dir, steps, args.file_type, args.workers, on_progress=report)
+    for error in progress["errors"]:
+        print(f"Error: {error}")
+
+
+if __name__ == "__main__":
+    main()
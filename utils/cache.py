@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Memory tier size, on-disk tier size and location of the result cache
+RESULT_CACHE_MEMORY_BYTES = int(os.environ.get("RESULT_CACHE_MEMORY_BYTES", 256 * 1024 * 1024))
+RESULT_CACHE_DISK_BYTES = int(os.environ.get("RESULT_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", os.path.join(".cache", "results"))
+
+# File name suffixes used to remember a disk entry's media type
+DISK_SUFFIXES = {
+    None: ".txt",
+    "image/jpeg": ".jpg",
+    "audio/wav": ".wav",
+    "model/off": ".off",
+    "application/x-npz": ".npz",
+    "application/x-ply": ".ply",
+}
+SUFFIX_MEDIA_TYPES = {suffix: media_type for media_type, suffix in DISK_SUFFIXES.items()}
+
+
+class ByteLRU:
+    """
+    Thread-safe LRU mapping bounded by the total size of its values in bytes.
+    With `ttl` (seconds), entries not accessed for that long are dropped.
+    """
+
+    def __init__(self, max_bytes, sizeof=len, ttl=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.total_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expiry(self):
+        return time.monotonic() + self.ttl if self.ttl else None
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            value, size, expires_at = self._items[key]
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._items[key]
+                self.total_bytes -= size
+                return default
+            self._items[key] = (value, size, self._expiry())
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._items:
+                self.total_bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, size, self._expiry())
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._items.popitem(last=False)
+                self.total_bytes -= evicted_size
+        return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            value, size, _ = self._items.pop(key)
+            self.total_bytes -= size
+            return value
+
+    def items(self):
+        """Snapshot of (key, value) pairs, least recently used first."""
+        with self._lock:
+            return [(key, value) for key, (value, _, _) in self._items.items()]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    """Directory of cache entries, evicting least recently used files beyond `max_bytes`."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def _find(self, key):
+        for suffix, media_type in SUFFIX_MEDIA_TYPES.items():
+            path = os.path.join(self.directory, key + suffix)
+            if os.path.exists(path):
+                return path, media_type
+        return None, None
+
+    def get(self, key):
+        path, media_type = self._find(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+            # Reads refresh the entry's position in the eviction order
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        if media_type is None:
+            body = body.decode("utf-8")
+        return body, media_type
+
+    def put(self, key, body, media_type):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        if len(data) > self.max_bytes:
+            return
+        path = os.path.join(self.directory, key + DISK_SUFFIXES[media_type])
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.total_bytes += len(data)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted((entry for entry in os.scandir(self.directory) if entry.is_file()),
+                         key=lambda entry: entry.stat().st_mtime)
+        self.total_bytes = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+
+def _entry_size(entry):
+    body, _ = entry
+    return len(body.encode("utf-8")) if isinstance(body, str) else len(body)
+
+
+class ResultCache:
+    """Two-tier cache of encoded op results: an in-memory LRU in front of a disk cache."""
+
+    def __init__(self, memory_bytes, disk_bytes, directory):
+        self.memory = ByteLRU(memory_bytes, sizeof=_entry_size)
+        self.disk = DiskCache(directory, disk_bytes) if disk_bytes > 0 else None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def get(self, key):
+        """Return (body, media_type) or None."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.stats["memory_hits"] += 1
+            return entry
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self.memory.put(key, entry)
+                return entry
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, body, media_type):
+        self.stats["stores"] += 1
+        self.memory.put(key, (body, media_type))
+        if self.disk is not None:
+            self.disk.put(key, body, media_type)
+
+    def report(self):
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.total_bytes,
+            "disk_bytes": self.disk.total_bytes if self.disk is not None else 0,
+        }
+
+
+result_cache = ResultCache(RESULT_CACHE_MEMORY_BYTES, RESULT_CACHE_DISK_BYTES, RESULT_CACHE_DIR)
+
+# (path, size, mtime) -> sha256 of the file contents, so unchanged files are hashed once
+_digests = ByteLRU(4096, sizeof=lambda digest: 1)
+
+
+def file_digest(file_path):
+    """Content hash of a file, memoized on its path, size and modification time."""
+    stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    digest = _digests.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _digests.put(memo_key, digest)
+    return digest
+
+
+def make_key(digest, file_type, operation, seed=None):
+    """Cache key for applying `operation` (any JSON-able description) to the file with content hash `digest`."""
+    payload = json.dumps({"file": digest, "file_type": file_type, "operation": operation, "seed": seed},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,143 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from utils import registry
+
+# Thread pool for OpenCV / NumPy / torch ops, which release the GIL while they work
+THREAD_WORKERS = int(os.environ.get("THREAD_WORKERS", os.cpu_count() or 4))
+# Process pool for pure-Python NLTK work, which holds the GIL
+PROCESS_WORKERS = int(os.environ.get("PROCESS_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+# Jobs allowed to wait for a worker of each pool on top of the ones already running
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", 32))
+# Seconds a request waits for a queue slot before it is rejected
+QUEUE_TIMEOUT = float(os.environ.get("QUEUE_TIMEOUT", 2.0))
+
+PROCESS_MODALITIES = {"text"}
+
+_thread_pool = None
+_process_pool = None
+# Admission semaphore per pool, so a backlog of text jobs cannot starve image/audio/3D jobs or the reverse
+_slots = {}
+
+
+class QueueFullError(Exception):
+    """Raised when no worker slot frees up within QUEUE_TIMEOUT."""
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=THREAD_WORKERS, thread_name_prefix="ops")
+    return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # Spawn rather than fork: forking a process that already runs torch threads can deadlock.
+        # Workers load the PRELOAD_MODALITIES backends when they start, other backends on first use.
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=registry.preload)
+    return _process_pool
+
+
+def uses_process_pool(file_type, isolated=False):
+    """Whether a job of this modality (or an isolated one) runs in the process pool."""
+    return isolated or file_type in PROCESS_MODALITIES
+
+
+def _get_slots(process):
+    if process not in _slots:
+        workers = PROCESS_WORKERS if process else THREAD_WORKERS
+        _slots[process] = asyncio.Semaphore(workers + MAX_QUEUED_JOBS)
+    return _slots[process]
+
+
+def pool_for(file_type, isolated=False):
+    """
+    Pick the pool that suits a modality's workload. Isolated jobs always go to
+    the process pool, where each worker runs one job at a time; seeded jobs
+    need that because they reseed the global random generators.
+    """
+    if uses_process_pool(file_type, isolated):
+        return _get_process_pool()
+    return _get_thread_pool()
+
+
+async def _acquire_slot(process=False):
+    slots = _get_slots(process)
+    try:
+        await asyncio.wait_for(slots.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise QueueFullError("Server busy, retry later")
+    return slots
+
+
+async def run_in_pool(file_type, func, *args, isolated=False, **kwargs):
+    """
+    Run a blocking op off the event loop. Each pool admits its worker count plus
+    MAX_QUEUED_JOBS jobs at once; further requests wait up to QUEUE_TIMEOUT
+    seconds for a slot of that pool and then get QueueFullError, so a burst of
+    slow requests cannot build an unbounded backlog.
+    """
+    slots = await _acquire_slot(uses_process_pool(file_type, isolated))
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool_for(file_type, isolated), functools.partial(func, *args, **kwargs))
+    finally:
+        slots.release()
+
+
+async def stream_in_pool(func, *args, **kwargs):
+    """
+    Open a blocking chunk iterator with `func(*args, **kwargs)` on the thread
+    pool and return an async iterator over its chunks, for a StreamingResponse.
+    Errors from opening the stream reach the caller before the response starts.
+    The stream holds one of the thread pool's admission slots, like a job of
+    `run_in_pool`, until it is exhausted or the client goes away.
+    """
+    slots = await _acquire_slot()
+    loop = asyncio.get_running_loop()
+    pool = _get_thread_pool()
+    try:
+        chunks = await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+    except BaseException:
+        slots.release()
+        raise
+
+    async def iterate():
+        try:
+            while True:
+                chunk = await loop.run_in_executor(pool, next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            slots.release()
+
+    return iterate()
+
+
+def _shutdown_pool(pool):
+    # cancel_futures (drop queued jobs instead of running them) needs Python 3.9
+    if sys.version_info >= (3, 9):
+        pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        pool.shutdown(wait=False)
+
+
+def shutdown():
+    """Stop both pools; called when the app shuts down."""
+    global _thread_pool, _process_pool
+    if _thread_pool is not None:
+        _shutdown_pool(_thread_pool)
+        _thread_pool = None
+    if _process_pool is not None:
+        _shutdown_pool(_process_pool)
+        _process_pool = None
+    _slots.clear()
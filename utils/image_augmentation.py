@@ -1,38 +1,72 @@
 import cv2
-import base64
 import numpy as np 
 
+from utils import pixel_ops, image_geometry
+
 def read_image(image_path):
     """Read an image from a file."""
     return cv2.imread(image_path)
 
-def image_to_base64(image):
-    """Convert an image (numpy array) to a base64-encoded string."""
-    _, buffer = cv2.imencode('.jpg', image)
-    return base64.b64encode(buffer).decode('utf-8')
+def image_to_bytes(image, extension='.jpg'):
+    """Encode an image (numpy array) to compressed bytes."""
+    _, buffer = cv2.imencode(extension, image)
+    return buffer.tobytes()
+
+def random_horizontal_flip_array(image):
+    """Randomly flip an image array horizontally."""
+    if np.random.rand() > 0.5:
+        return cv2.flip(image, 1)
+    return image
+
+def random_vertical_flip_array(image):
+    """Randomly flip an image array vertically."""
+    if np.random.rand() > 0.5:
+        return cv2.flip(image, 0)
+    return image
+
+def random_rotation_array(image, max_angle=90):
+    """Randomly rotate an image array by an angle."""
+    angle = np.random.randint(-max_angle, max_angle)
+    (h, w) = image.shape[:2]
+    center = (w // 2, h // 2)
+    rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    return cv2.warpAffine(image, rotation_matrix, (w, h))
+
+def random_scaling_array(image):
+    """
+    Apply random scaling to an image array while keeping its original size
+    """
+    # Zoom about the center by a random factor between 0.5 and 1.5 in a single warp:
+    # smaller results are centered on a black canvas, larger ones are center-cropped
+    height, width = image.shape[:2]
+    matrix, size = image_geometry.random_scaling_affine((width, height))
+    return image_geometry.warp(image, matrix, size)
+
+def color_jitter_array(image, brightness_range=(0.8, 1.2), contrast_range=(0.8, 1.2)):
+    """Randomly adjust the brightness and contrast of an image array."""
+    # Generate random brightness and contrast values
+    brightness_factor = np.random.uniform(*brightness_range)
+    contrast_factor = np.random.uniform(*contrast_range)
+    
+    # Contrast (as cv2.convertScaleAbs) then brightness with clipping to [0, 255],
+    # applied as one lookup table
+    lut = pixel_ops.build_lut((("contrast", contrast_factor, 0.0), ("brightness", brightness_factor)))
+    return pixel_ops.apply_lut(image, lut)
 
 def random_horizontal_flip(image):
     """Randomly flip the image horizontally."""
     image = read_image(image)
-    if np.random.rand() > 0.5:
-        return image_to_base64(cv2.flip(image, 1))
-    return image_to_base64(image)
+    return random_horizontal_flip_array(image)
 
 def random_vertical_flip(image):
     """Randomly flip the image vertically."""
     image = read_image(image)
-    if np.random.rand() > 0.5:
-        return image_to_base64(cv2.flip(image, 0))
-    return image_to_base64(image)
+    return random_vertical_flip_array(image)
 
 def random_rotation(image, max_angle=90):
     """Randomly rotate the image by an angle."""
     image = read_image(image)
-    angle = np.random.randint(-max_angle, max_angle)
-    (h, w) = image.shape[:2]
-    center = (w // 2, h // 2)
-    rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
-    return image_to_base64(cv2.warpAffine(image, rotation_matrix, (w, h)))
+    return random_rotation_array(image, max_angle)
 
 def random_scaling(file_path):
     """
@@ -44,50 +78,7 @@ def random_scaling(file_path):
         if image is None:
             return "Error: Could not read image"
 
-        # Get original dimensions
-        height, width = image.shape[:2]
-        
-        # Generate random scale factor between 0.5 and 1.5
-        scale_factor = np.random.uniform(0.5, 1.5)
-        
-        # Calculate new dimensions while maintaining aspect ratio
-        new_height = int(height * scale_factor)
-        new_width = int(width * scale_factor)
-        
-        # Resize image using the scale factor
-        scaled_image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
-        
-        # Create a new image with original size
-        result_image = np.zeros_like(image)
-        
-        # Calculate starting positions to center the scaled image
-        start_y = max(0, (height - new_height) // 2)
-        start_x = max(0, (width - new_width) // 2)
-        
-        # If scaled image is larger, crop it to fit
-        if new_height > height or new_width > width:
-            crop_y = max(0, (new_height - height) // 2)
-            crop_x = max(0, (new_width - width) // 2)
-            scaled_image = scaled_image[
-                crop_y:crop_y + min(height, new_height),
-                crop_x:crop_x + min(width, new_width)
-            ]
-            # Update dimensions after cropping
-            new_height, new_width = scaled_image.shape[:2]
-            start_y = (height - new_height) // 2
-            start_x = (width - new_width) // 2
-        
-        # Copy the scaled image into the result image
-        result_image[
-            start_y:start_y + new_height,
-            start_x:start_x + new_width
-        ] = scaled_image
-
-        # Encode the result image
-        _, buffer = cv2.imencode('.jpg', result_image)
-        image_base64 = base64.b64encode(buffer).decode('utf-8')
-        
-        return image_base64
+        return random_scaling_array(image)
     except Exception as e:
         return f"Error in scaling: {str(e)}"
 
@@ -95,15 +86,4 @@ def color_jitter(image_path, brightness_range=(0.8, 1.2), contrast_range=(0.8, 1
     """Randomly adjust the brightness and contrast of the image."""
     # Read the image
     image = read_image(image_path)
-    
-    # Generate random brightness and contrast values
-    brightness_factor = np.random.uniform(*brightness_range)
-    contrast_factor = np.random.uniform(*contrast_range)
-    
-    # Apply brightness and contrast adjustment
-    # Adjust brightness by converting to float, scaling, and clipping to [0, 255]
-    jittered_image = cv2.convertScaleAbs(image, alpha=contrast_factor, beta=0)
-    jittered_image = np.clip(jittered_image * brightness_factor, 0, 255).astype(np.uint8)
-    
-    # Convert to base64 to display
-    return image_to_base64(jittered_image)
+    return color_jitter_array(image, brightness_range, contrast_range)
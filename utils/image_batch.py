@@ -0,0 +1,108 @@
+"""
+Batched image augmentation over (N, H, W, C) uint8 arrays.
+
+Every sample gets its own random parameters, but the work is done with
+array-wide NumPy operations (flip masks, per-sample lookup tables) or one
+OpenCV warp per image into a preallocated batch. Results are returned as
+arrays, without encoding, so they can feed a data loader directly.
+"""
+import cv2
+import numpy as np
+
+from utils import pixel_ops
+
+
+def _rng(rng):
+    return rng if rng is not None else np.random.default_rng()
+
+
+def horizontal_flip_batch(images, p=0.5, rng=None):
+    """Mirror a random subset (probability `p` each) of the images left-right."""
+    mask = _rng(rng).random(len(images)) < p
+    out = images.copy()
+    out[mask] = images[mask, :, ::-1]
+    return out
+
+
+def vertical_flip_batch(images, p=0.5, rng=None):
+    """Mirror a random subset (probability `p` each) of the images upside down."""
+    mask = _rng(rng).random(len(images)) < p
+    out = images.copy()
+    out[mask] = images[mask, ::-1]
+    return out
+
+
+def _warp_batch(images, matrices):
+    """Apply one 2x3 affine matrix per image, writing into a preallocated batch."""
+    out = np.empty_like(images)
+    h, w = images.shape[1:3]
+    for i, matrix in enumerate(matrices):
+        # Single-channel images come back from OpenCV without the channel axis
+        out[i] = cv2.warpAffine(images[i], matrix, (w, h)).reshape(out.shape[1:])
+    return out
+
+
+def rotation_batch(images, max_angle=90, rng=None):
+    """Rotate each image about its center by its own random angle in [-max_angle, max_angle)."""
+    angles = _rng(rng).integers(-max_angle, max_angle, len(images))
+    h, w = images.shape[1:3]
+    center = (w // 2, h // 2)
+    matrices = [cv2.getRotationMatrix2D(center, float(angle), 1.0) for angle in angles]
+    return _warp_batch(images, matrices)
+
+
+def scaling_batch(images, scale_range=(0.5, 1.5), rng=None):
+    """Zoom each image about its center by its own random factor, keeping the image size."""
+    scales = _rng(rng).uniform(*scale_range, len(images))
+    h, w = images.shape[1:3]
+    center = (w / 2, h / 2)
+    matrices = [cv2.getRotationMatrix2D(center, 0, float(scale)) for scale in scales]
+    return _warp_batch(images, matrices)
+
+
+def color_jitter_batch(images, brightness_range=(0.8, 1.2), contrast_range=(0.8, 1.2), rng=None):
+    """
+    Adjust brightness and contrast with per-image factors. Each image gets a
+    256-entry lookup table reproducing `color_jitter` (contrast with
+    saturating rounding, then brightness with clipping and truncation), and all
+    tables are applied in one fancy-indexing pass.
+    """
+    rng = _rng(rng)
+    brightness = rng.uniform(*brightness_range, len(images))[:, None]
+    contrast = rng.uniform(*contrast_range, len(images))[:, None]
+    values = np.arange(256, dtype=np.float64)[None, :]
+    luts = pixel_ops.STEPS["contrast"](values, contrast)
+    luts = np.clip(luts * brightness, 0, 255).astype(np.uint8)  # (N, 256)
+    index = np.arange(len(images)).reshape((-1,) + (1,) * (images.ndim - 1))
+    return luts[index, images]
+
+
+BATCH_OPS = {
+    "Horizontal Flip": horizontal_flip_batch,
+    "Vertical Flip": vertical_flip_batch,
+    "Rotation": rotation_batch,
+    "Scaling": scaling_batch,
+    "Brightness Adjustment": color_jitter_batch,
+}
+
+
+def augment_batch(images, options, rng=None, seed=None):
+    """Apply the augmentation options in order to a (N, H, W, C) uint8 batch."""
+    for option in options:
+        if option not in BATCH_OPS:
+            raise ValueError(f"Invalid option selected: {option}")
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    for option in options:
+        images = BATCH_OPS[option](images, rng=rng)
+    return images
+
+
+def load_batch(file_paths, size=(256, 256)):
+    """Read images and resize them to a common (width, height) as one (N, H, W, 3) batch."""
+    batch = np.empty((len(file_paths), size[1], size[0], 3), dtype=np.uint8)
+    for i, file_path in enumerate(file_paths):
+        image = cv2.imread(file_path)
+        if image is None:
+            raise ValueError(f"Could not read image: {file_path}")
+        cv2.resize(image, tuple(size), dst=batch[i])
+    return batch
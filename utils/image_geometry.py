@@ -0,0 +1,110 @@
+"""
+Geometric image ops as affine transforms.
+
+Flips, rotation, scaling, center crop and resize each map output pixel
+coordinates linearly from the input ones, so a chain of them is one 3x3
+matrix. Composing the matrices and calling `cv2.warpAffine` once resamples
+the image a single time instead of once per op. Random parameters are drawn
+from `np.random` exactly as the per-op functions draw them.
+
+Every builder takes the current image size (width, height) and returns
+(3x3 matrix mapping input to output pixel coordinates, output size).
+"""
+import cv2
+import numpy as np
+
+
+def _affine(a, b, c, d, e, f):
+    return np.array([[a, b, c], [d, e, f], [0.0, 0.0, 1.0]])
+
+
+def _scale_about_pixels(sx, sy, tx=0.0, ty=0.0):
+    # Pixel centers sit at x + 0.5, as in cv2.resize
+    return _affine(sx, 0, 0.5 * sx - 0.5 + tx, 0, sy, 0.5 * sy - 0.5 + ty)
+
+
+def horizontal_flip_affine(image_size):
+    w, h = image_size
+    return _affine(-1, 0, w - 1, 0, 1, 0), image_size
+
+
+def vertical_flip_affine(image_size):
+    w, h = image_size
+    return _affine(1, 0, 0, 0, -1, h - 1), image_size
+
+
+def random_horizontal_flip_affine(image_size):
+    if np.random.rand() > 0.5:
+        return horizontal_flip_affine(image_size)
+    return np.eye(3), image_size
+
+
+def random_vertical_flip_affine(image_size):
+    if np.random.rand() > 0.5:
+        return vertical_flip_affine(image_size)
+    return np.eye(3), image_size
+
+
+def random_rotation_affine(image_size, max_angle=90):
+    angle = np.random.randint(-max_angle, max_angle)
+    w, h = image_size
+    matrix = np.vstack([cv2.getRotationMatrix2D((w // 2, h // 2), float(angle), 1.0), [0.0, 0.0, 1.0]])
+    return matrix, image_size
+
+
+def scaling_affine(image_size, scale_factor):
+    """Zoom by `scale_factor`, centered, keeping the size (as `random_scaling_array` lays it out)."""
+    w, h = image_size
+    new_w, new_h = int(w * scale_factor), int(h * scale_factor)
+    # Smaller results are centered on a black canvas, larger ones are center-cropped
+    tx = (w - new_w) // 2 if new_w <= w else -((new_w - w) // 2)
+    ty = (h - new_h) // 2 if new_h <= h else -((new_h - h) // 2)
+    return _scale_about_pixels(new_w / w, new_h / h, tx, ty), image_size
+
+
+def random_scaling_affine(image_size, scale_range=(0.5, 1.5)):
+    return scaling_affine(image_size, np.random.uniform(*scale_range))
+
+
+def crop_affine(image_size, crop_fraction=0.5):
+    w, h = image_size
+    start_x = int(w * (1 - crop_fraction) / 2)
+    start_y = int(h * (1 - crop_fraction) / 2)
+    return _affine(1, 0, -start_x, 0, 1, -start_y), (int(w * crop_fraction), int(h * crop_fraction))
+
+
+def resize_affine(image_size, size=(256, 256)):
+    w, h = image_size
+    new_w, new_h = (int(v) for v in size)
+    return _scale_about_pixels(new_w / w, new_h / h), (new_w, new_h)
+
+
+AFFINES = {
+    "horizontal_flip": random_horizontal_flip_affine,
+    "vertical_flip": random_vertical_flip_affine,
+    "rotation": random_rotation_affine,
+    "scaling": random_scaling_affine,
+    "crop": crop_affine,
+    "resize": resize_affine,
+}
+
+
+def compose(steps, image_size):
+    """Compose (kind, params) steps for an image of `image_size`; returns (3x3 matrix, output size)."""
+    matrix = np.eye(3)
+    for kind, params in steps:
+        step_matrix, image_size = AFFINES[kind](image_size, **(params or {}))
+        matrix = step_matrix @ matrix
+    return matrix, image_size
+
+
+def warp(image, matrix, output_size):
+    """Resample `image` once through `matrix`, filling uncovered pixels with black."""
+    return cv2.warpAffine(image, matrix[:2], tuple(int(v) for v in output_size), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+
+def warp_steps(image, steps):
+    """Apply a chain of geometric steps with a single warp."""
+    h, w = image.shape[:2]
+    return warp(image, *compose(steps, (w, h)))
@@ -1,42 +1,60 @@
 import cv2
-import base64
 import numpy as np 
 
+from utils import pixel_ops
+
 def read_image(image_path):
     """Read an image from a file."""
     return cv2.imread(image_path)
 
-def image_to_base64(image):
-    """Convert an image (numpy array) to a base64-encoded string."""
-    _, buffer = cv2.imencode('.jpg', image)
-    return base64.b64encode(buffer).decode('utf-8')
+def image_to_bytes(image, extension='.jpg'):
+    """Encode an image (numpy array) to compressed bytes."""
+    _, buffer = cv2.imencode(extension, image)
+    return buffer.tobytes()
+
+def resize_array(image, size=(256, 256)):
+    """Resize an image array to (width, height)."""
+    return cv2.resize(image, tuple(size))
+
+def normalize_array(image):
+    # Scale to [0, 1] and back to [0, 255] for display, as one lookup table
+    # instead of two float64 copies of the image. No `out` buffer here: every
+    # defaulted argument of an op is a client-settable step param
+    return pixel_ops.apply_steps(image, (("normalize", 0.0, 1.0), ("scale", 255)))
+
+def grayscaling_array(image):
+    """Convert a BGR image array to grayscale."""
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+def crop_image_array(image, crop_fraction=0.5):
+    """Crop an image array to a central region."""
+    h, w = image.shape[:2]
+    start_x = int(w * (1 - crop_fraction) / 2)
+    start_y = int(h * (1 - crop_fraction) / 2)
+    return image[start_y:start_y + int(h * crop_fraction), start_x:start_x + int(w * crop_fraction)]
+
+def denoise_image_array(image):
+    """Reduce noise in an image array using Gaussian Blur."""
+    return cv2.GaussianBlur(image, (5, 5), 0)
 
 def resize(image, size=(256, 256)):
     image = read_image(image)
-    return image_to_base64(cv2.resize(image, size))
+    return resize_array(image, size)
 
 def normalize(image):
-    # Normalization logic (e.g., scaling pixel values)
     image = read_image(image)
-    normalized_image = image / 255.0  # Scale to [0, 1]
-    # Rescale back to [0, 255] for display and convert to uint8
-    display_image = (normalized_image * 255).astype(np.uint8)
-    return image_to_base64(display_image)
+    return normalize_array(image)
 
 def grayscaling(image):
     image = read_image(image)
-    return image_to_base64(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+    return grayscaling_array(image)
 
 def crop_image(image, crop_fraction=0.5):
     """Crop the image to a central square."""
     image = read_image(image)
-    h, w = image.shape[:2]
-    start_x = int(w * (1 - crop_fraction) / 2)
-    start_y = int(h * (1 - crop_fraction) / 2)
-    return image_to_base64(image[start_y:start_y + int(h * crop_fraction), start_x:start_x + int(w * crop_fraction)])
+    return crop_image_array(image, crop_fraction)
 
 def denoise_image(image):
     """Reduce noise in the image using Gaussian Blur."""
     image = read_image(image)
-    return image_to_base64(cv2.GaussianBlur(image, (5, 5), 0))
-
+    return denoise_image_array(image)
@@ -0,0 +1,212 @@
+"""
+Fast mesh I/O shared by the 3D modules.
+
+OFF text is formatted and parsed in bulk by NumPy instead of one Python
+f-string or trimesh object per vertex. Binary PLY and NPZ write straight from
+the array buffers and are the formats to use for large meshes.
+"""
+import io
+import os
+
+import numpy as np
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+def _format_rows(rows, fmt):
+    """Format a 2D array with one printf-style row format in a single C-level pass."""
+    if len(rows) == 0:
+        return ""
+    return (fmt * len(rows)) % tuple(rows.ravel().tolist())
+
+
+def format_off(vertices, faces, precision=17):
+    """Serialize vertices and faces to OFF file contents (bytes)."""
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    parts = ['OFF\n', f'{len(vertices)} {len(faces)} 0\n',
+             _format_rows(vertices, f'%.{precision}g %.{precision}g %.{precision}g\n')]
+    faces_array = np.asarray(faces) if len(faces) else np.zeros((0, 3), dtype=np.int64)
+    if faces_array.dtype != object and faces_array.ndim == 2:
+        k = faces_array.shape[1]
+        counted = np.column_stack([np.full(len(faces_array), k), faces_array]).astype(np.int64)
+        parts.append(_format_rows(counted, ' '.join(['%d'] * (k + 1)) + '\n'))
+    else:
+        # Mixed polygon sizes: fall back to one line per face
+        parts.extend(f'{len(face)} {" ".join(map(str, face))}\n' for face in faces)
+    return ''.join(parts).encode('utf-8')
+
+
+def _triangulate(faces):
+    """Fan-triangulate a (F, k) array of polygons into (F * (k - 2), 3) triangles."""
+    k = faces.shape[1]
+    if k == 3:
+        return faces
+    fans = [np.stack([faces[:, 0], faces[:, i], faces[:, i + 1]], axis=1) for i in range(1, k - 1)]
+    return np.stack(fans, axis=1).reshape(-1, 3)
+
+
+def parse_off(data):
+    """Parse OFF file contents into (vertices (V, 3) float64, triangle faces (F, 3) int64)."""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    lines = data.split('\n')
+    if '#' in data:
+        lines = [line.split('#', 1)[0] for line in lines]
+    lines = [line for line in (line.strip() for line in lines) if line]
+
+    header = lines[0]
+    if not header.startswith('OFF'):
+        raise ValueError(f"Invalid OFF file header: {header}")
+    # Some exporters put the counts on the header line ("OFF 8 6 0" or "OFF8 6 0")
+    if header[3:].strip():
+        counts, body = header[3:].split(), lines[1:]
+    else:
+        counts, body = lines[1].split(), lines[2:]
+    n_vertices, n_faces = int(counts[0]), int(counts[1])
+
+    vertices = np.fromstring(' '.join(body[:n_vertices]), dtype=np.float64, sep=' ')
+    vertices = vertices.reshape(n_vertices, -1)[:, :3] if n_vertices else np.zeros((0, 3))
+
+    face_lines = body[n_vertices:n_vertices + n_faces]
+    if not face_lines:
+        return vertices, np.zeros((0, 3), dtype=np.int64)
+    try:
+        flat = np.fromstring(' '.join(face_lines), dtype=np.int64, sep=' ')
+    except ValueError:
+        # Float per-face colors do not parse as integers
+        flat = None
+    k = int(face_lines[0].split()[0])
+    if flat is not None and flat.size == n_faces * (k + 1):
+        faces = flat.reshape(n_faces, k + 1)
+        if (faces[:, 0] == k).all():
+            return vertices, _triangulate(faces[:, 1:])
+    # Mixed polygon sizes (or trailing per-face colors): triangulate face by face
+    triangles = []
+    for line in face_lines:
+        # Colors may be floats, so only the count and the indices are parsed as ints
+        values = line.split()
+        count = int(values[0])
+        polygon = np.array([int(value) for value in values[1:count + 1]], dtype=np.int64).reshape(1, -1)
+        triangles.append(_triangulate(polygon))
+    return vertices, np.concatenate(triangles)
+
+
+def load_off(file_path):
+    with open(file_path, 'rb') as f:
+        return parse_off(f.read())
+
+
+def save_off(vertices, faces, output_path, precision=17):
+    with open(output_path, 'wb') as f:
+        f.write(format_off(vertices, faces, precision))
+    return output_path
+
+
+def format_ply(vertices, faces):
+    """Serialize to binary little-endian PLY contents (bytes) with float32 vertices and int32 triangle faces."""
+    vertices = np.ascontiguousarray(vertices, dtype='<f4').reshape(-1, 3)
+    faces = np.asarray(faces, dtype='<i4').reshape(-1, 3)
+    header = (
+        "ply\nformat binary_little_endian 1.0\n"
+        f"element vertex {len(vertices)}\n"
+        "property float x\nproperty float y\nproperty float z\n"
+        f"element face {len(faces)}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    )
+    face_records = np.empty(len(faces), dtype=[('count', 'u1'), ('indices', '<i4', (3,))])
+    face_records['count'] = 3
+    face_records['indices'] = faces
+    return header.encode('ascii') + vertices.tobytes() + face_records.tobytes()
+
+
+def save_ply(vertices, faces, output_path):
+    with open(output_path, 'wb') as f:
+        f.write(format_ply(vertices, faces))
+    return output_path
+
+
+def load_ply(file_path):
+    """Read a binary little-endian PLY whose faces are all triangles (as written by `save_ply`)."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    end = data.index(b'end_header\n') + len(b'end_header\n')
+    header = data[:end].decode('ascii').split('\n')
+    if 'format binary_little_endian 1.0' not in header:
+        raise ValueError("Only binary little-endian PLY files are supported")
+
+    elements = []
+    for line in header:
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property':
+            elements[-1][2].append(words[1:])
+
+    offset = end
+    vertices = faces = None
+    for name, count, properties in elements:
+        if properties and properties[0][0] == 'list':
+            _, count_type, index_type, field = properties[0]
+            dtype = np.dtype([('count', '<' + PLY_TYPES[count_type]), (field, '<' + PLY_TYPES[index_type], (3,))])
+        else:
+            dtype = np.dtype([(prop[1], '<' + PLY_TYPES[prop[0]]) for prop in properties])
+        records = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += dtype.itemsize * count
+        if name == 'vertex':
+            vertices = np.stack([records['x'], records['y'], records['z']], axis=1).astype(np.float64)
+        elif name == 'face':
+            if count and not (records['count'] == 3).all():
+                raise ValueError("Only triangle faces are supported")
+            faces = records[dtype.names[1]].astype(np.int64)
+    return vertices, faces
+
+
+def format_npz(vertices, faces):
+    """Serialize to .npz contents (bytes) with `vertices` and `faces` arrays."""
+    buffer = io.BytesIO()
+    np.savez(buffer, vertices=np.asarray(vertices), faces=np.asarray(faces))
+    return buffer.getvalue()
+
+
+def save_npz(vertices, faces, output_path):
+    np.savez(output_path, vertices=np.asarray(vertices), faces=np.asarray(faces))
+    return output_path
+
+
+def load_npz(file_path):
+    with np.load(file_path) as data:
+        return data['vertices'], data['faces']
+
+
+WRITERS = {".off": save_off, ".ply": save_ply, ".npz": save_npz}
+# In-memory encoders with the media type their bytes are served as
+FORMATTERS = {
+    "off": (format_off, "model/off"),
+    "ply": (format_ply, "application/x-ply"),
+    "npz": (format_npz, "application/x-npz"),
+}
+READERS = {".off": load_off, ".ply": load_ply, ".npz": load_npz}
+
+
+def save_mesh(vertices, faces, output_path):
+    """Write a mesh in the format given by the file extension (.off, .ply or .npz)."""
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported mesh format: {extension}")
+    return WRITERS[extension](vertices, faces, output_path)
+
+
+def load_mesh(file_path):
+    """Read a mesh in the format given by the file extension (.off, .ply or .npz)."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported mesh format: {extension}")
+    return READERS[extension](file_path)
@@ -0,0 +1,157 @@
+"""
+Per-op and per-phase instrumentation.
+
+A job records what it does into a trace: each decode, op and encode phase with
+its duration, input size and output size, and whether it failed. The trace
+travels back with the job's result, so jobs that ran in a worker process are
+counted too, and the server merges it into process-wide histograms and
+counters. `render()` formats those in the Prometheus text format for /metrics;
+`server_timing()` formats one trace as a Server-Timing header.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.asset_store import asset_size
+
+METRICS_PREFIX = "preprocess"
+# Add a Server-Timing header to every processing response (clients can also ask per request)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+
+_local = threading.local()
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects."""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name, self.help_text, self.labels, self.buckets = name, help_text, labels, buckets
+        self.series = {}
+
+    def observe(self, label_values, value):
+        counts, total = self.series.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self.series[label_values] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self.series.items()):
+            labels = _labels(self.labels, label_values)
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {counts[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name, self.help_text, self.labels = name, help_text, labels
+        self.series = {}
+
+    def inc(self, label_values, value=1):
+        self.series[label_values] = self.series.get(label_values, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines.extend(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}"
+                     for label_values, value in sorted(self.series.items()))
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+_lock = threading.Lock()
+PHASE_LABELS = ("file_type", "phase", "op")
+durations = Histogram(f"{METRICS_PREFIX}_phase_duration_seconds",
+                      "Time spent per decode, op and encode phase.", PHASE_LABELS, DURATION_BUCKETS)
+input_bytes = Histogram(f"{METRICS_PREFIX}_phase_input_bytes",
+                        "Size of the data a phase received.", PHASE_LABELS, SIZE_BUCKETS)
+output_bytes = Histogram(f"{METRICS_PREFIX}_phase_output_bytes",
+                         "Size of the data a phase produced.", PHASE_LABELS, SIZE_BUCKETS)
+errors = Counter(f"{METRICS_PREFIX}_phase_errors_total", "Phases that raised an error.", PHASE_LABELS)
+requests = Histogram(f"{METRICS_PREFIX}_request_duration_seconds",
+                     "End-to-end time of processing requests, including queueing.", ("endpoint", "status"),
+                     DURATION_BUCKETS)
+METRICS = [durations, input_bytes, output_bytes, errors, requests]
+
+
+def start_trace():
+    _local.trace = []
+
+
+def finish_trace():
+    trace, _local.trace = getattr(_local, "trace", None) or [], None
+    return trace
+
+
+@contextmanager
+def phase(name, op, file_type, data=None):
+    """
+    Time a block as one phase of the current trace; outside a trace it is
+    recorded straight away. `data` is the phase's input; assign the result to
+    `event["output"]` to record its size too.
+    """
+    trace = getattr(_local, "trace", None)
+    event = {"phase": name, "op": op, "file_type": file_type,
+             "input_bytes": asset_size(data) if data is not None else None}
+    started = time.perf_counter()
+    try:
+        yield event
+    except Exception:
+        event["error"] = True
+        raise
+    finally:
+        event["seconds"] = time.perf_counter() - started
+        if "output" in event:
+            event["output_bytes"] = asset_size(event.pop("output"))
+        if trace is not None:
+            trace.append(event)
+        else:
+            record([event])
+
+
+def record(trace):
+    """Merge a finished job trace into the process-wide metrics."""
+    with _lock:
+        for event in trace:
+            labels = (event["file_type"], event["phase"], event["op"])
+            durations.observe(labels, event["seconds"])
+            if event.get("input_bytes") is not None:
+                input_bytes.observe(labels, event["input_bytes"])
+            if event.get("output_bytes") is not None:
+                output_bytes.observe(labels, event["output_bytes"])
+            if event.get("error"):
+                errors.inc(labels)
+
+
+def record_request(endpoint, status, seconds):
+    with _lock:
+        requests.observe((endpoint, str(status)), seconds)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(trace, **extra_seconds):
+    """A Server-Timing header value for one trace, plus named extra durations (e.g. total=...)."""
+    entries = [f'{event["phase"]}-{event["op"]};dur={event["seconds"] * 1000:.2f}' for event in trace]
+    entries.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in extra_seconds.items())
+    return ", ".join(entries)
@@ -0,0 +1,291 @@
+import inspect
+import os
+import random
+import sys
+
+import numpy as np
+
+from utils import registry, metrics
+from utils.asset_store import assets
+
+# Ops are "module:function" references, imported by `registry.resolve` only when
+# a job runs them, so the backends of unused modalities are never loaded.
+
+# Decoders: file path -> in-memory data passed from op to op.
+# Audio and 3D data are tuples, (waveform, sample_rate) and (vertices, faces).
+LOADERS = {
+    "text": "utils.text_processing:read_lines",
+    "image": "utils.image_processing:read_image",
+    "audio": "utils.audio_augmentation:load_audio",
+    "3d": "utils.three_d_processing:load_off_file",
+}
+
+# Output formats that do not follow the input's extension
+OUTPUT_EXTENSIONS = {
+    "audio": ".wav",
+    "3d": ".off",
+}
+
+PREPROCESS_OPS = {
+    "text": {
+        "Tokenize": "utils.text_processing:tokenize_lines",
+        "Padding/Truncating": "utils.text_processing:padding_truncating_lines",
+        "Lowercase": "utils.text_processing:lowercase_lines",
+        "StopWord Removal": "utils.text_processing:remove_stopwords_lines",
+        "Stemming": "utils.text_processing:perform_stemming_lines",
+        "Lemmatization": "utils.text_processing:perform_lemmatization_lines",
+    },
+    "image": {
+        "Resizing": "utils.image_processing:resize_array",
+        "Normalization": "utils.image_processing:normalize_array",
+        "Grayscaling": "utils.image_processing:grayscaling_array",
+        "Cropping": "utils.image_processing:crop_image_array",
+        "Denoising": "utils.image_processing:denoise_image_array",
+    },
+    "audio": {
+        "Resampling": "utils.audio_processing:resample_waveform",
+        "Normalization": "utils.audio_processing:normalize_waveform",
+        "Trimming Silence": "utils.audio_processing:trim_silence_waveform",
+        "Dynamic Range Compression": "utils.audio_processing:compress_waveform",
+    },
+    "3d": {
+        "Normalization": "utils.three_d_processing:normalization_vertices",
+        "Centering": "utils.three_d_processing:centering_vertices",
+    },
+}
+
+AUGMENTATION_OPS = {
+    "text": {
+        "Synonym Replacement": "utils.text_augmentation:synonym_replacement_lines",
+        "Random Insertion": "utils.text_augmentation:random_insertion_lines",
+        "Random Deletion": "utils.text_augmentation:random_deletion_lines",
+        "Random Swap": "utils.text_augmentation:random_swap_lines",
+    },
+    "image": {
+        "Horizontal Flip": "utils.image_augmentation:random_horizontal_flip_array",
+        "Vertical Flip": "utils.image_augmentation:random_vertical_flip_array",
+        "Rotation": "utils.image_augmentation:random_rotation_array",
+        "Scaling": "utils.image_augmentation:random_scaling_array",
+        "Brightness Adjustment": "utils.image_augmentation:color_jitter_array",
+    },
+    "audio": {
+        "Time Stretching": "utils.audio_augmentation:time_stretch_waveform",
+        "Pitch Shifting": "utils.audio_augmentation:pitch_shift_waveform",
+        "Random Noise Addition": "utils.audio_augmentation:add_noise_waveform",
+        "Random Volume Adjustment": "utils.audio_augmentation:random_volume_adjustment_waveform",
+        "Time Shifting": "utils.audio_augmentation:time_shift_waveform",
+        "Spectral Masking": "utils.audio_augmentation:spec_augment_waveform",
+    },
+    "3d": {
+        "Rotation": "utils.three_d_augmentation:rotation_vertices",
+        "Scaling": "utils.three_d_augmentation:scaling_vertices",
+        "Adding Noise": "utils.three_d_augmentation:adding_noise_vertices",
+    },
+}
+
+# Audio ops that work on the spectrogram; consecutive ones share one STFT/iSTFT
+STFT_OPS = {
+    "utils.audio_augmentation:time_stretch_waveform": "time_stretch",
+    "utils.audio_augmentation:pitch_shift_waveform": "pitch_shift",
+    "utils.audio_augmentation:spec_augment_waveform": "spec_augment",
+}
+
+# Token-level text ops; consecutive ones share one tokenization (see utils/text_fused.py)
+TOKEN_OPS = {
+    "utils.text_processing:tokenize_lines": "Tokenize",
+    "utils.text_processing:lowercase_lines": "Lowercase",
+    "utils.text_processing:noise_removal_lines": "Noise Removal",
+    "utils.text_processing:remove_stopwords_lines": "StopWord Removal",
+    "utils.text_processing:perform_stemming_lines": "Stemming",
+    "utils.text_processing:perform_lemmatization_lines": "Lemmatization",
+    "utils.text_processing:padding_truncating_lines": "Padding/Truncating",
+}
+
+# Geometric image ops; consecutive ones are composed into one affine warp
+GEOMETRIC_OPS = {
+    "utils.image_processing:resize_array": "resize",
+    "utils.image_processing:crop_image_array": "crop",
+    "utils.image_augmentation:random_horizontal_flip_array": "horizontal_flip",
+    "utils.image_augmentation:random_vertical_flip_array": "vertical_flip",
+    "utils.image_augmentation:random_rotation_array": "rotation",
+    "utils.image_augmentation:random_scaling_array": "scaling",
+}
+
+STAGES = {
+    "preprocess": PREPROCESS_OPS,
+    "augmentation": AUGMENTATION_OPS,
+}
+
+
+def get_op(file_type, option, stage=None):
+    """Look up an op reference by its UI option name, optionally restricted to one stage."""
+    stages = [STAGES[stage]] if stage else STAGES.values()
+    for ops in stages:
+        op = ops.get(file_type, {}).get(option)
+        if op is not None:
+            return op
+    raise ValueError(f"Invalid option selected: {option}")
+
+
+def is_deterministic(file_type, steps):
+    """Preprocessing ops are pure functions of their input; augmentations are random."""
+    for step in steps:
+        stage = step.get("stage")
+        if stage == "augmentation":
+            return False
+        if stage is None and step.get("option") not in PREPROCESS_OPS.get(file_type, {}):
+            return False
+    return True
+
+
+def seed_everything(seed):
+    """
+    Seed every random generator the ops draw from. torch is only seeded once a
+    backend has imported it, so load the job's modality before seeding.
+    """
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    if "torch" in sys.modules:
+        sys.modules["torch"].manual_seed(seed)
+
+
+def apply_op(op, data, params=None):
+    """Apply one op to in-memory data; tuple data is unpacked into positional args."""
+    params = params or {}
+    if isinstance(data, tuple):
+        return op(*data, **params)
+    return op(data, **params)
+
+
+def op_params(op, params):
+    """The op's default keyword arguments overridden by `params`."""
+    defaults = {name: p.default for name, p in inspect.signature(op).parameters.items()
+                if p.default is not inspect.Parameter.empty}
+    return {**defaults, **(params or {})}
+
+
+def check_params(op, option, params):
+    """
+    Reject params the op's own signature does not take. Runs before fusion, so
+    a fused run accepts exactly what the per-op chain would.
+    """
+    accepted = {name for name, p in inspect.signature(op).parameters.items()
+                if p.default is not inspect.Parameter.empty}
+    unknown = sorted(set(params or {}) - accepted)
+    if unknown:
+        raise ValueError(f"{option} does not take parameter(s): {', '.join(unknown)}")
+
+
+def _stft_op(run):
+    steps = [(STFT_OPS[op], op_params(registry.resolve(op), params)) for op, params in run]
+    return "utils.audio_stft:transform_waveform", registry.call("utils.audio_stft:combine_steps", steps)
+
+
+def _token_op(run):
+    names = [TOKEN_OPS[op] for op, _ in run]
+    steps = [{"option": TOKEN_OPS[op], "params": params or {}} for op, params in run]
+    return "utils.text_fused:fused_lines", {"steps": steps,
+                                            "tokenizer": registry.call("utils.text_fused:tokenizer_for", names)}
+
+
+def _token_can_extend(run, option):
+    return registry.call("utils.text_fused:can_extend", run, option)
+
+
+def _geometric_op(run):
+    return "utils.image_geometry:warp_steps", {"steps": [(GEOMETRIC_OPS[op], params or {}) for op, params in run]}
+
+
+def _fuse_runs(ops, names, build, can_extend=None):
+    """Replace each run of two or more consecutive ops found in `names` with `build(run)`."""
+    fused, run = [], []
+
+    def flush():
+        if len(run) > 1:
+            fused.append(build(run))
+        else:
+            fused.extend(run)
+
+    for op, params in ops:
+        if op in names:
+            if run and can_extend and not can_extend([names[run_op] for run_op, _ in run], names[op]):
+                flush()
+                run = []
+            run.append((op, params))
+            continue
+        flush()
+        run = []
+        fused.append((op, params))
+    flush()
+    return fused
+
+
+def fuse_ops(ops):
+    """
+    Merge consecutive ops that can share one pass: STFT-domain audio ops run
+    as one `transform_waveform` call, token-level text ops as one `fused_lines`
+    call and geometric image ops as one `warp_steps` call.
+    """
+    ops = _fuse_runs(ops, STFT_OPS, _stft_op)
+    ops = _fuse_runs(ops, GEOMETRIC_OPS, _geometric_op)
+    return _fuse_runs(ops, TOKEN_OPS, _token_op, _token_can_extend)
+
+
+def save_output(data, file_type, output_path):
+    """Write the final in-memory result to `output_path` in the modality's native format."""
+    if file_type == "text":
+        with open(output_path, 'w') as f:
+            f.write('\n'.join(data))
+    elif file_type == "image":
+        import cv2
+        if not cv2.imwrite(output_path, data):
+            raise IOError(f"Could not write image: {output_path}")
+    elif file_type == "audio":
+        registry.call("utils.audio_augmentation:save_audio", *data, output_path)
+    elif file_type == "3d":
+        result = registry.call("utils.three_d_processing:save_off_file", *data, output_path)
+        if result != output_path:
+            raise IOError(result)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    return output_path
+
+
+def output_path_for(output_path, file_type):
+    """Swap the extension for modalities whose output format is fixed."""
+    extension = OUTPUT_EXTENSIONS.get(file_type)
+    if extension:
+        output_path = os.path.splitext(output_path)[0] + extension
+    return output_path
+
+
+def run_pipeline(file_path, file_type, steps, upload_id=None):
+    """
+    Decode `file_path` once and run each step on the in-memory result. Each step
+    is a dict with an "option" name (as shown in the UI), optional "params" and
+    an optional "stage" ("preprocess" or "augmentation") to disambiguate names
+    shared by both stages. Returns the final in-memory result; encoding it is
+    left to the caller. With an `upload_id` the decoded input is taken from, or
+    kept in, the asset store.
+    """
+    if file_type not in LOADERS:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    ops = [(get_op(file_type, step.get("option"), step.get("stage")), step.get("params")) for step in steps]
+    registry.load_modality(file_type)
+    for (op, params), step in zip(ops, steps):
+        check_params(registry.resolve(op), step.get("option"), params)
+    ops = [(registry.resolve(op), params) for op, params in fuse_ops(ops)]
+
+    loader = registry.resolve(LOADERS[file_type])
+    with metrics.phase("decode", loader.__name__, file_type) as event:
+        data = event["output"] = assets.load(file_path, file_type, loader, upload_id)
+    for op, params in ops:
+        with metrics.phase("op", op.__name__, file_type, data) as event:
+            data = event["output"] = apply_op(op, data, params)
+    return data
+
+
+def run_pipeline_to_file(file_path, file_type, steps, output_path):
+    """Run the steps and write the final output to disk; returns the written path."""
+    output_path = output_path_for(output_path, file_type)
+    return save_output(run_pipeline(file_path, file_type, steps), file_type, output_path)
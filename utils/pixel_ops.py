@@ -0,0 +1,107 @@
+"""
+Pixel-wise image ops compiled to lookup tables.
+
+A chain of per-pixel steps (contrast, brightness, gamma, scaling,
+normalization) is evaluated once on the 256 possible uint8 values and the
+resulting table is applied with a single `cv2.LUT` call. That replaces several
+full-size float64 temporaries with one pass over the image, and the output can
+be written into a preallocated buffer.
+
+Steps are hashable tuples so compiled tables can be cached:
+    ("contrast", alpha, beta)   saturating, rounded `alpha * x + beta` (as cv2.convertScaleAbs)
+    ("brightness", factor)      `x * factor`
+    ("gamma", gamma)            `255 * (x / 255) ** gamma`
+    ("scale", factor, offset)   `x * factor + offset`
+    ("normalize", mean, std)    `(x / 255 - mean) / std`; mean and std may be per-channel tuples
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+
+def _contrast(values, alpha, beta=0.0):
+    # convertScaleAbs computes in float32, takes the absolute value and rounds half to even
+    scaled = values.astype(np.float32) * np.float32(alpha) + np.float32(beta)
+    return np.clip(np.rint(np.abs(scaled)), 0, 255).astype(np.float64)
+
+
+def _brightness(values, factor):
+    return values * factor
+
+
+def _gamma(values, gamma):
+    return 255.0 * (np.clip(values, 0, 255) / 255.0) ** gamma
+
+
+def _scale(values, factor, offset=0.0):
+    return values * factor + offset
+
+
+def _normalize(values, mean=0.0, std=1.0):
+    # Tuples give one column per channel
+    mean = np.asarray(mean, dtype=np.float64)
+    std = np.asarray(std, dtype=np.float64)
+    if mean.ndim or std.ndim:
+        values = values[:, None]
+    return (values / 255.0 - mean) / std
+
+
+STEPS = {
+    "contrast": _contrast,
+    "brightness": _brightness,
+    "gamma": _gamma,
+    "scale": _scale,
+    "normalize": _normalize,
+}
+
+
+def build_lut(steps, dtype="uint8"):
+    """
+    Evaluate a tuple of steps on every uint8 value. A uint8 table is clipped to
+    [0, 255] and truncated (as `astype(np.uint8)` does); a float32 table keeps
+    the exact values, for model input. Per-channel steps give a (256, 1, C) table.
+    """
+    values = np.arange(256, dtype=np.float64)
+    for name, *args in steps:
+        if name not in STEPS:
+            raise ValueError(f"Unknown pixel op: {name}")
+        values = STEPS[name](values, *args)
+    if dtype == "uint8":
+        values = np.clip(values, 0, 255)
+    lut = values.astype(dtype)
+    if lut.ndim == 2:
+        lut = np.ascontiguousarray(lut.reshape(256, 1, -1))
+    return lut
+
+
+@lru_cache(maxsize=256)
+def compile_lut(steps, dtype="uint8"):
+    """Cached `build_lut`, for fixed chains; random per-call factors should use `build_lut`."""
+    lut = build_lut(steps, dtype)
+    lut.flags.writeable = False
+    return lut
+
+
+def apply_lut(image, lut, out=None):
+    """Map every pixel through `lut`, writing into `out` when a buffer is given."""
+    if lut.ndim == 3 and (image.ndim != 3 or image.shape[2] != lut.shape[2]):
+        raise ValueError("Per-channel table does not match the number of image channels")
+    if out is None:
+        return cv2.LUT(image, lut)
+    cv2.LUT(image, lut, dst=out)
+    return out
+
+
+def apply_steps(image, steps, dtype="uint8", out=None):
+    """Compile (or reuse) the table for `steps` and apply it to a uint8 image."""
+    return apply_lut(image, compile_lut(tuple(steps), dtype), out)
+
+
+def to_float32(image, mean=0.0, std=1.0, out=None):
+    """Convert a uint8 image to normalized float32 model input in one pass."""
+    if isinstance(mean, (list, np.ndarray)):
+        mean = tuple(float(m) for m in mean)
+    if isinstance(std, (list, np.ndarray)):
+        std = tuple(float(s) for s in std)
+    return apply_steps(image, (("normalize", mean, std),), dtype="float32", out=out)
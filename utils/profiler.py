@@ -0,0 +1,87 @@
+"""
+Sampling profiler for hot-path investigation.
+
+While running, a background thread samples the stacks of the op worker threads
+every PROFILE_INTERVAL seconds and counts each distinct stack. `collapsed()`
+returns them in the collapsed format read by flamegraph.pl and speedscope
+("file:function;file:function count" per line). Sampling costs nothing while
+it is off and little while it is on, so it can be toggled on a live server.
+Only this process is sampled; text jobs in worker processes are not.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.005))
+# Threads whose name starts with this are sampled (the executor's op pool); empty samples every thread
+PROFILE_THREADS = os.environ.get("PROFILE_THREADS", "ops")
+# Start sampling as soon as the server starts
+PROFILE_ON_START = os.environ.get("PROFILE_ON_START", "0") == "1"
+
+
+def _stack(frame):
+    names = []
+    while frame is not None:
+        names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.stacks = Counter()
+        self.samples = 0
+        self.interval = PROFILE_INTERVAL
+        self.started = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None, thread_prefix=PROFILE_THREADS):
+        """Start sampling with fresh counts; returns False if already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks, self.samples = Counter(), 0
+            self.interval = interval or PROFILE_INTERVAL
+            self.started = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(thread_prefix,), name="profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, thread_prefix):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me and names.get(ident, "").startswith(thread_prefix):
+                    self.stacks[_stack(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        """Stop sampling and return the collapsed stacks."""
+        with self._lock:
+            if self.running:
+                self._stop.set()
+                self._thread.join()
+                self._thread = None
+        return self.collapsed()
+
+    def collapsed(self, limit=None):
+        stacks = sorted(self.stacks.copy().items(), key=lambda item: -item[1])[:limit]
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def report(self):
+        return {"running": self.running, "interval": self.interval, "samples": self.samples,
+                "seconds": round(time.time() - self.started, 2) if self.started else 0.0,
+                "stacks": len(self.stacks)}
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,118 @@
+"""
+Lazy registry of modality backends.
+
+Ops are referenced as "module:function" strings and only imported when a job
+needs them, so a server that only sees images never imports torch, NLTK or
+trimesh. PRELOAD_MODALITIES (e.g. "image,audio" or "all") imports chosen
+modalities at startup instead, so their first request is not slowed down.
+`report()` gives the startup time and the import time and memory each
+modality cost when it was loaded.
+"""
+import importlib
+import os
+import threading
+import time
+from functools import lru_cache
+
+# Modules that make up each modality's backend; importing them loads its libraries
+MODALITY_MODULES = {
+    "text": ["utils.text_processing", "utils.text_augmentation", "utils.text_fused"],
+    "image": ["utils.image_processing", "utils.image_augmentation", "utils.image_geometry"],
+    "audio": ["utils.audio_processing", "utils.audio_augmentation", "utils.audio_stft"],
+    "3d": ["utils.three_d_processing", "utils.three_d_augmentation"],
+}
+
+# Run once after a modality is preloaded, to build per-process state ahead of the first request
+WARMUPS = {
+    "audio": "utils.audio_transforms:warm_up",
+}
+
+PRELOAD_MODALITIES = [name.strip() for name in os.environ.get("PRELOAD_MODALITIES", "").split(",") if name.strip()]
+
+_lock = threading.RLock()
+_loaded = {}
+_startup = {}
+_imported_at = time.time()
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No /proc: fall back to the peak, which is in KiB on Linux
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def process_age():
+    """Seconds since this process started (since this module was imported, without /proc)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22, counted after the parenthesized command name, is the start time in clock ticks since boot
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time() - _imported_at
+
+
+@lru_cache(maxsize=None)
+def resolve(ref):
+    """Import and return the object named by a "module:function" reference."""
+    module, _, name = ref.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def call(ref, *args, **kwargs):
+    """Resolve `ref` and call it; lets a worker process import a backend the server never loads."""
+    return resolve(ref)(*args, **kwargs)
+
+
+def load_modality(file_type):
+    """Import a modality's backend once, recording how long it took and the memory it added."""
+    if file_type in _loaded or file_type not in MODALITY_MODULES:
+        return
+    with _lock:
+        if file_type in _loaded:
+            return
+        started, rss = time.perf_counter(), rss_bytes()
+        for module in MODALITY_MODULES[file_type]:
+            importlib.import_module(module)
+        _loaded[file_type] = {"import_seconds": round(time.perf_counter() - started, 4),
+                              "rss_delta_bytes": rss_bytes() - rss}
+
+
+def is_loaded(file_type):
+    return file_type in _loaded
+
+
+def preload(modalities=None):
+    """Load (and warm up) the given modalities, PRELOAD_MODALITIES by default; "all" loads every one."""
+    modalities = PRELOAD_MODALITIES if modalities is None else modalities
+    if "all" in modalities:
+        modalities = list(MODALITY_MODULES)
+    for file_type in modalities:
+        if file_type not in MODALITY_MODULES:
+            raise ValueError(f"Unknown modality: {file_type}")
+        load_modality(file_type)
+        if file_type in WARMUPS:
+            resolve(WARMUPS[file_type])()
+
+
+def mark_ready():
+    """Record the startup time and memory; called once the server is ready for requests."""
+    _startup.update({"startup_seconds": round(process_age(), 4), "startup_rss_bytes": rss_bytes()})
+
+
+def report():
+    return {
+        "pid": os.getpid(),
+        **_startup,
+        "rss_bytes": rss_bytes(),
+        "preloaded": PRELOAD_MODALITIES,
+        "modalities": {file_type: {"loaded": file_type in _loaded, **_loaded.get(file_type, {})}
+                       for file_type in MODALITY_MODULES},
+    }
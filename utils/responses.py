@@ -0,0 +1,111 @@
+import hashlib
+import os
+
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+from utils import registry, metrics
+from utils.cache import DiskCache, DISK_SUFFIXES
+from utils.pipeline import seed_everything
+
+# Served result files; the least recently stored or requested ones are deleted beyond RESULTS_BYTES
+RESULTS_DIR = os.path.join("static", "results")
+RESULTS_BYTES = int(os.environ.get("RESULTS_BYTES", 1024 * 1024 * 1024))
+
+MEDIA_TYPES = {
+    "image": "image/jpeg",
+    "audio": "audio/wav",
+    "3d": "model/off",
+}
+
+# Encoders are resolved on first use, like the ops (see utils/registry.py)
+ENCODERS = {
+    "image": "utils.image_processing:image_to_bytes",
+    "audio": "utils.audio_augmentation:audio_to_bytes",
+    "3d": "utils.three_d_processing:off_to_bytes",
+}
+
+_results = None
+
+
+def encode(data, file_type):
+    """
+    Encode an op's in-memory result for the response. Returns (body, media_type);
+    media_type is None when the body is text for the JSON "output" field (text
+    results, error messages and paths of files the op already wrote).
+    """
+    if isinstance(data, str):
+        return data, None
+    if file_type == "text":
+        return '\n'.join(data), None
+    if file_type == "image":
+        return registry.call(ENCODERS["image"], data), MEDIA_TYPES["image"]
+    if file_type in ("audio", "3d"):
+        return registry.call(ENCODERS[file_type], *data), MEDIA_TYPES[file_type]
+    raise ValueError(f"Unsupported file type: {file_type}")
+
+
+def run_and_encode(func, file_type, *args, seed=None):
+    """
+    Run an op and encode its result in the same worker. With a seed the global
+    random generators are seeded first, so the job must run in an isolated
+    worker process (see executor.run_in_pool). Returns (body, media_type, trace),
+    the trace holding the job's timed phases (see utils/metrics.py); if the job
+    fails, the trace is attached to the exception as `trace`.
+    """
+    metrics.start_trace()
+    try:
+        if seed is not None:
+            # Import the backend first so the generators it brings (torch) get seeded too
+            registry.load_modality(file_type)
+            seed_everything(seed)
+        data = func(*args)
+        encoder = ENCODERS.get(file_type, "join_lines").rpartition(":")[2]
+        with metrics.phase("encode", encoder, file_type, data) as event:
+            body, media_type = encode(data, file_type)
+            event["output"] = body
+    except Exception as e:
+        # Attributes survive pickling, so this also works from a worker process
+        e.trace = metrics.finish_trace()
+        raise
+    return body, media_type, metrics.finish_trace()
+
+
+def _get_results():
+    # Created on first use: worker processes import this module but never store results
+    global _results
+    if _results is None:
+        _results = DiskCache(RESULTS_DIR, RESULTS_BYTES)
+    return _results
+
+
+def store_result(body, media_type):
+    """
+    Write `body` under a name derived from its hash and return its URL. The
+    directory is bounded by RESULTS_BYTES like the result cache's disk tier, so
+    a URL stays valid until newer results push it out.
+    """
+    key = hashlib.sha256(body).hexdigest()
+    name = key + DISK_SUFFIXES[media_type]
+    results = _get_results()
+    try:
+        # Already stored: only refresh its place in the eviction order
+        os.utime(os.path.join(RESULTS_DIR, name))
+    except FileNotFoundError:
+        results.put(key, body, media_type)
+    return f"/static/results/{name}"
+
+
+async def build_response(body, media_type, file_type, binary=False):
+    """
+    Text bodies go into the JSON "output" field. Binary bodies are either sent
+    as the raw response (`binary=True`) or stored content-addressed, in which
+    case "output" holds the URL the client fetches them from. Storing writes
+    the file (and may evict older ones) on a thread, off the event loop.
+    """
+    if media_type is None:
+        return JSONResponse({"output": body, "file_type": file_type})
+    if binary:
+        return Response(content=body, media_type=media_type)
+    url = await run_in_threadpool(store_result, body, media_type)
+    return JSONResponse({"output": url, "file_type": file_type})
@@ -0,0 +1,152 @@
+"""
+Precomputed WordNet synonym index.
+
+Every WordNet lemma name is mapped to its candidate synonyms once, and the
+result is saved as a compact .npz (one UTF-8 blob of words plus int32 offset
+and id arrays). Loading it takes a fraction of a second and a lookup is a
+dict access, instead of `wordnet.synsets` per word. Candidates are ordered so
+the first one is `synsets[0].lemmas()[0]`, the synonym the augmentation has
+always used.
+
+Build ahead of time with:
+    python -m utils.synonym_index [--pos n]
+A server started with text in PRELOAD_MODALITIES also builds the default
+index at startup if it is missing; other servers never load NLTK for it.
+Worker processes only load an existing index; without one, lookups fall back
+to live WordNet calls.
+"""
+import argparse
+import os
+import random
+from functools import lru_cache
+
+import numpy as np
+
+SYNONYM_INDEX_DIR = os.environ.get("SYNONYM_INDEX_DIR", os.path.join(".cache", "synonyms"))
+
+
+def wordnet_synonym(word):
+    """First lemma of the first synset of `word`, or None; a live WordNet lookup."""
+    from nltk.corpus import wordnet
+    synsets = wordnet.synsets(word)
+    return synsets[0].lemmas()[0].name() if synsets else None
+
+
+def index_path(pos=None):
+    return os.path.join(SYNONYM_INDEX_DIR, f"synonyms_{pos or 'all'}.npz")
+
+
+def build_index(output_path=None, pos=None):
+    """Walk WordNet once and save the word -> candidates index; `pos` is 'n', 'v', 'a' or 'r'."""
+    from nltk.corpus import wordnet
+    output_path = output_path or index_path(pos)
+    words = sorted(wordnet.all_lemma_names(pos))
+    ids = {word: i for i, word in enumerate(words)}
+    offsets = np.zeros(len(words) + 1, dtype=np.int32)
+    candidates = []
+    for i, word in enumerate(words):
+        seen = set()
+        for synset in wordnet.synsets(word, pos):
+            for lemma in synset.lemmas():
+                name = lemma.name()
+                if name not in seen:
+                    seen.add(name)
+                    # Lemma names of other parts of speech are added to the word list
+                    candidates.append(ids.setdefault(name, len(ids)))
+        offsets[i + 1] = len(candidates)
+    words = list(ids)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    # Written aside and renamed, so a reader never loads a half-written index
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        np.savez(f,
+                 words=np.frombuffer('\n'.join(words).encode('utf-8'), dtype=np.uint8),
+                 offsets=offsets,
+                 candidates=np.array(candidates, dtype=np.int32))
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def ensure_index(pos=None):
+    """Build the index for `pos` unless it exists; run once before workers call `get_index`."""
+    path = index_path(pos)
+    if not os.path.exists(path):
+        build_index(path, pos)
+    return path
+
+
+class SynonymIndex:
+    """Loaded synonym index; `candidates`, `first` and `choose` are O(1) lookups."""
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.words = data['words'].tobytes().decode('utf-8').split('\n')
+            self.offsets = data['offsets']
+            self.ids = data['candidates']
+        # Only the first len(offsets) - 1 words have candidate lists
+        self.rows = {word: i for i, word in enumerate(self.words[:len(self.offsets) - 1])}
+
+    def _row(self, word):
+        # WordNet lemma names are lowercase, as `wordnet.synsets` assumes
+        return self.rows.get(word.lower())
+
+    def __contains__(self, word):
+        return self._row(word) is not None
+
+    def candidates(self, word):
+        row = self._row(word)
+        if row is None:
+            return []
+        return [self.words[i] for i in self.ids[self.offsets[row]:self.offsets[row + 1]]]
+
+    def first(self, word):
+        row = self._row(word)
+        if row is None or self.offsets[row] == self.offsets[row + 1]:
+            return None
+        return self.words[self.ids[self.offsets[row]]]
+
+    def choose(self, word):
+        """A random candidate other than the word itself, when there is one."""
+        candidates = self.candidates(word)
+        others = [candidate for candidate in candidates if candidate != word.lower()]
+        if others:
+            return random.choice(others)
+        return candidates[0] if candidates else None
+
+
+@lru_cache(maxsize=None)
+def get_index(pos=None):
+    """Load the index for `pos`, or None if it has not been built (see `ensure_index`)."""
+    path = index_path(pos)
+    if not os.path.exists(path):
+        return None
+    return SynonymIndex(path)
+
+
+@lru_cache(maxsize=100000)
+def _fallback(word):
+    return wordnet_synonym(word)
+
+
+def lookup_synonym(word, choose_any=False, pos=None):
+    """
+    Synonym for `word` from the index. Inflected forms ("cats") are not index
+    keys; they fall back to a (memoized) WordNet lookup, which resolves them
+    through its morphology rules, as does every word while no index is built.
+    """
+    index = get_index(pos)
+    if index is not None and word in index:
+        return index.choose(word) if choose_any else index.first(word)
+    return _fallback(word) if pos is None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the WordNet synonym index.")
+    parser.add_argument("--pos", choices=["n", "v", "a", "r"], help="Only synonyms of this part of speech")
+    parser.add_argument("--output", help="Output .npz path")
+    args = parser.parse_args()
+    print(f"Wrote {build_index(args.output, args.pos)}")
+
+
+if __name__ == "__main__":
+    main()
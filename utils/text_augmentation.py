@@ -1,58 +1,78 @@
 import nltk 
 import random
-from nltk.corpus import wordnet
-
-def synonym_replacement(text, n=3):
-    # Replace words in the text with their synonyms using NLTK or WordNet.
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    cleaned_lines = []
-    for line in lines: 
-        words = line.split()
-        for _ in range(n):
-            word_to_replace = random.choice(words)
-            synonyms = wordnet.synsets(word_to_replace)
-            if synonyms:
-                synonym = synonyms[0].lemmas()[0].name()
-                words = [synonym if word == word_to_replace else word for word in words]
-        cleaned_lines.append(' '.join(words))
-    return '\n'.join(cleaned_lines)
+from functools import partial
 
+from utils import text_batch
+from utils.synonym_index import lookup_synonym
 
-def random_deletion(text, deletion_prob=0.2):
+def read_lines(file_path):
+    """Read a text file into a list of lines."""
+    with open(file_path, 'r') as f:
+        return f.readlines()
+
+def synonym_replacement_line(line, n=3, choose_any=False):
+    # Replace words in the text with their synonyms from the precomputed WordNet index.
+    # By default the first lemma of the first synset is used; choose_any picks among all of them.
+    words = line.split()
+    if not words:
+        return ''
+    for _ in range(n):
+        word_to_replace = random.choice(words)
+        synonym = lookup_synonym(word_to_replace, choose_any)
+        if synonym:
+            words = [synonym if word == word_to_replace else word for word in words]
+    return ' '.join(words)
+
+def random_deletion_line(line, deletion_prob=0.2):
     # Randomly remove words from the text to create new variations.
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    cleaned_lines = []
-    for line in lines: 
-        words = line.split()
-        new_words = [word for word in words if random.random() > deletion_prob]
-        cleaned_lines.append(' '.join(new_words))
-    return '\n'.join(cleaned_lines)
+    words = line.split()
+    return ' '.join(word for word in words if random.random() > deletion_prob)
 
-def random_insertion(text):
+def random_insertion_line(line):
     # Insert random words into the text to create new sentences.
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    cleaned_lines = []
-    for line in lines: 
-        words = line.split()
-        random_word = random.choice(words)
-        words.insert(random.randint(0, len(words)), random_word)
-        cleaned_lines.append(' '.join(words))
-    return '\n'.join(cleaned_lines)
+    words = line.split()
+    if not words:
+        return ''
+    random_word = random.choice(words)
+    words.insert(random.randint(0, len(words)), random_word)
+    return ' '.join(words)
 
-def random_swap(text):
+def random_swap_line(line):
     # Randomly swap words in the text to create new variations.
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    cleaned_lines = []
-    for line in lines: 
-        words = line.split()
-        if len(words) < 2:
-            cleaned_lines.append(line)
-        else:
-            idx1, idx2 = random.sample(range(len(words)), 2)
-            words[idx1], words[idx2] = words[idx2], words[idx1]
-            cleaned_lines.append(' '.join(words))
-    return '\n'.join(cleaned_lines)
\ No newline at end of file
+    words = line.split()
+    if len(words) < 2:
+        return line
+    idx1, idx2 = random.sample(range(len(words)), 2)
+    words[idx1], words[idx2] = words[idx2], words[idx1]
+    return ' '.join(words)
+
+# Whole-corpus variants run on the vectorized engine in utils/text_batch.py
+
+def synonym_replacement_lines(lines, n=3, choose_any=False):
+    tokens, offsets, vocab = text_batch.encode_corpus(lines)
+    lookup = partial(lookup_synonym, choose_any=choose_any)
+    return text_batch.decode_corpus(*text_batch.synonym_replacement_batch(tokens, offsets, vocab, n, lookup))
+
+def random_deletion_lines(lines, deletion_prob=0.2):
+    tokens, offsets, vocab = text_batch.encode_corpus(lines)
+    return text_batch.decode_corpus(*text_batch.random_deletion_batch(tokens, offsets, deletion_prob), vocab)
+
+def random_insertion_lines(lines):
+    tokens, offsets, vocab = text_batch.encode_corpus(lines)
+    return text_batch.decode_corpus(*text_batch.random_insertion_batch(tokens, offsets), vocab)
+
+def random_swap_lines(lines):
+    tokens, offsets, vocab = text_batch.encode_corpus(lines)
+    return text_batch.decode_corpus(*text_batch.random_swap_batch(tokens, offsets), vocab)
+
+def synonym_replacement(text, n=3, choose_any=False):
+    return '\n'.join(synonym_replacement_lines(read_lines(text), n, choose_any))
+
+def random_deletion(text, deletion_prob=0.2):
+    return '\n'.join(random_deletion_lines(read_lines(text), deletion_prob))
+
+def random_insertion(text):
+    return '\n'.join(random_insertion_lines(read_lines(text)))
+
+def random_swap(text):
+    return '\n'.join(random_swap_lines(read_lines(text)))
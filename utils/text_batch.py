@@ -0,0 +1,119 @@
+"""
+Vectorized text augmentation over a whole corpus.
+
+A corpus is tokenized once into a flat int32 array of token ids, an offsets
+array (line i is tokens[offsets[i]:offsets[i + 1]]) and a vocabulary list.
+Deletion, swap, insertion and synonym replacement then run as NumPy operations
+over every line at once, and words are joined back into strings only at output.
+
+Random draws use `rng.random`, so `rng` may be a `np.random.Generator` or the
+global `np.random` module (the default, which `seed_everything` seeds).
+"""
+import numpy as np
+
+from utils.synonym_index import lookup_synonym
+
+
+def encode_corpus(lines):
+    """Split lines on whitespace into (tokens, offsets, vocab)."""
+    index = {}
+    tokens, counts = [], []
+    for line in lines:
+        words = line.split()
+        tokens.extend(index.setdefault(word, len(index)) for word in words)
+        counts.append(len(words))
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return np.array(tokens, dtype=np.int32), offsets, list(index)
+
+
+def decode_corpus(tokens, offsets, vocab):
+    """Join token ids back into one string per line."""
+    words = np.array(vocab, dtype=object)[tokens].tolist()
+    return [' '.join(words[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _line_lengths(offsets):
+    return np.diff(offsets)
+
+
+def _line_of_token(offsets):
+    """Line index of every token."""
+    return np.repeat(np.arange(len(offsets) - 1), _line_lengths(offsets))
+
+
+def random_deletion_batch(tokens, offsets, deletion_prob=0.2, rng=np.random):
+    """Drop each token with probability `deletion_prob`."""
+    keep = rng.random(len(tokens)) > deletion_prob
+    kept = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(keep, out=kept[1:])
+    return tokens[keep], kept[offsets]
+
+
+def random_swap_batch(tokens, offsets, rng=np.random):
+    """Swap two distinct random positions in every line of two or more tokens."""
+    lengths = _line_lengths(offsets)
+    lines = np.flatnonzero(lengths >= 2)
+    n = lengths[lines]
+    first = (rng.random(len(lines)) * n).astype(np.int64)
+    second = (rng.random(len(lines)) * (n - 1)).astype(np.int64)
+    second += second >= first
+    a, b = offsets[lines] + first, offsets[lines] + second
+    tokens = tokens.copy()
+    tokens[a], tokens[b] = tokens[b], tokens[a]
+    return tokens, offsets
+
+
+def random_insertion_batch(tokens, offsets, rng=np.random):
+    """Insert a copy of one random token of each non-empty line at a random position in that line."""
+    lengths = _line_lengths(offsets)
+    lines = np.flatnonzero(lengths > 0)
+    n = lengths[lines]
+    words = tokens[offsets[lines] + (rng.random(len(lines)) * n).astype(np.int64)]
+    positions = offsets[lines] + (rng.random(len(lines)) * (n + 1)).astype(np.int64)
+    # np.insert keeps the given order for equal positions, so a word appended to
+    # line i lands before one inserted at the start of line i + 1
+    inserted = np.zeros(len(offsets), dtype=np.int64)
+    np.cumsum(lengths > 0, out=inserted[1:])
+    return np.insert(tokens, positions, words), offsets + inserted
+
+
+def synonym_table(vocab, word_ids, lookup=lookup_synonym):
+    """
+    Look up each of `word_ids` once. Returns (replacement id per vocab id,
+    extended vocab); words without a synonym map to themselves.
+    """
+    vocab = list(vocab)
+    index = {word: i for i, word in enumerate(vocab)}
+    replacements = np.arange(len(vocab), dtype=np.int32)
+    for word_id in word_ids:
+        synonym = lookup(vocab[word_id])
+        if synonym is not None:
+            if synonym not in index:
+                index[synonym] = len(vocab)
+                vocab.append(synonym)
+            replacements[word_id] = index[synonym]
+    return replacements, vocab
+
+
+def synonym_replacement_batch(tokens, offsets, vocab, n=3, lookup=lookup_synonym, rng=np.random):
+    """
+    Pick `n` random words per line and replace every occurrence of them in that
+    line by their synonym. Unlike the per-line version, picks are drawn from the
+    original line, so a word that was just replaced is not picked again.
+    Returns (tokens, offsets, vocab).
+    """
+    lengths = _line_lengths(offsets)
+    lines = np.flatnonzero(lengths > 0)
+    if len(lines) == 0:
+        return tokens, offsets, vocab
+    picked_lines = np.repeat(lines, n)
+    picked = tokens[offsets[picked_lines] + (rng.random(len(picked_lines)) * lengths[picked_lines]).astype(np.int64)]
+    replacements, vocab = synonym_table(vocab, np.unique(picked), lookup)
+    # (line, word id) pairs as single int64 keys
+    size = len(vocab)
+    token_keys = _line_of_token(offsets) * size + tokens
+    replace = np.isin(token_keys, picked_lines * size + picked)
+    tokens = tokens.copy()
+    tokens[replace] = replacements[tokens[replace]]
+    return tokens, offsets, vocab
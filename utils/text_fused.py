@@ -0,0 +1,109 @@
+"""
+Single-pass fused text preprocessing.
+
+Each line is tokenized once; the token-level steps (lowercase, noise removal,
+stopword filter, stemming or lemmatization) are composed into one function
+that is evaluated once per distinct token of the document, and padding or
+truncation is applied last. The result is tokens, text lines or token ids,
+without re-tokenizing or rebuilding strings between steps.
+"""
+from nltk.tokenize import word_tokenize
+
+from utils.text_processing import (basic_english, preprocess_text, get_stop_words, stem_cache, lemma_cache,
+                                   PAD_TOKEN)
+
+TOKENIZERS = {
+    "whitespace": str.split,
+    "nltk": word_tokenize,
+    "basic_english": basic_english,
+}
+
+# Token -> token, or None to drop it
+TOKEN_OPS = {
+    "Lowercase": str.lower,
+    "Noise Removal": lambda token: preprocess_text(token) or None,
+    "StopWord Removal": lambda token: None if token.lower() in get_stop_words() else token,
+    "Stemming": stem_cache,
+    "Lemmatization": lemma_cache,
+}
+
+# Steps that tokenize the line their own way; in a fused chain they pick the tokenizer
+STEP_TOKENIZERS = {
+    "Tokenize": "basic_english",
+    "StopWord Removal": "nltk",
+}
+
+
+def compile_steps(steps):
+    """Resolve step names to (token functions, padding step params or None)."""
+    funcs, padding = [], None
+    for i, step in enumerate(steps):
+        option = step.get("option")
+        if option == "Padding/Truncating":
+            if i != len(steps) - 1:
+                raise ValueError("Padding/Truncating must be the last fused step")
+            padding = step.get("params") or {}
+        elif option in TOKEN_OPS:
+            funcs.append(TOKEN_OPS[option])
+        elif option not in STEP_TOKENIZERS:
+            raise ValueError(f"Invalid option selected: {option}")
+    return funcs, padding
+
+
+def transform_token(token, funcs):
+    for func in funcs:
+        token = func(token)
+        if not token:
+            return None
+    return token
+
+
+def fused_tokens(lines, steps, tokenizer="whitespace"):
+    """Run the steps over every line in one pass; returns one token list per line."""
+    funcs, padding = compile_steps(steps)
+    split = [TOKENIZERS[tokenizer](line) for line in lines]
+    forms = {token: transform_token(token, funcs) for token in {token for tokens in split for token in tokens}}
+    result = [[forms[token] for token in tokens if forms[token] is not None] for tokens in split]
+    if padding is not None:
+        max_length = padding.get("max_length")
+        if max_length is None:
+            max_length = max((len(tokens) for tokens in result), default=0)
+        pad_token = padding.get("pad_token", PAD_TOKEN)
+        result = [tokens[:max_length] + [pad_token] * (max_length - len(tokens)) for tokens in result]
+    return result
+
+
+def fused_lines(lines, steps, tokenizer="whitespace"):
+    """As `fused_tokens`, joined back into one string per line."""
+    return [' '.join(tokens) for tokens in fused_tokens(lines, steps, tokenizer)]
+
+
+def fused_ids(lines, steps, tokenizer="whitespace", vocab=None):
+    """
+    As `fused_tokens`, mapped to integer ids. `vocab` (token -> id) is extended
+    with unseen tokens; returns (one id list per line, vocab).
+    """
+    vocab = {} if vocab is None else vocab
+    ids = [[vocab.setdefault(token, len(vocab)) for token in tokens]
+           for tokens in fused_tokens(lines, steps, tokenizer)]
+    return ids, vocab
+
+
+def can_extend(run, option):
+    """
+    Whether `option` can join a fused run of step names. A step that tokenizes
+    differently (Tokenize, StopWord Removal) only commutes with Lowercase, so it
+    can only follow Lowercase steps; nothing follows Padding/Truncating.
+    """
+    if run and run[-1] == "Padding/Truncating":
+        return False
+    if option in STEP_TOKENIZERS:
+        return all(name == "Lowercase" for name in run)
+    return True
+
+
+def tokenizer_for(run):
+    for name in run:
+        if name in STEP_TOKENIZERS:
+            return STEP_TOKENIZERS[name]
+    return "whitespace"
@@ -1,82 +1,191 @@
 import re 
+import os
+import json
+import atexit
+from functools import lru_cache
 from nltk.corpus import stopwords
-from torchtext.data.utils import get_tokenizer
 from nltk.stem import PorterStemmer, WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 
+from utils.cache import ByteLRU
+
 ps = PorterStemmer()
 lemmatizer = WordNetLemmatizer() 
-stop_words = set(stopwords.words('english'))
+PAD_TOKEN = '<PAD>'
+
+# Distinct words remembered per stem/lemma cache, and where to persist them (unset: memory only)
+WORD_CACHE_SIZE = int(os.environ.get("WORD_CACHE_SIZE", 200000))
+WORD_CACHE_DIR = os.environ.get("WORD_CACHE_DIR")
+# New words computed between two saves of a persisted cache; the rest is saved when the process exits
+WORD_CACHE_SAVE_EVERY = int(os.environ.get("WORD_CACHE_SAVE_EVERY", 1000))
+
+class WordCache:
+    """
+    Bounded LRU memo of word -> stem (or lemma), shared by every request in
+    the process. Text is Zipfian, so a few thousand entries cover most tokens.
+    With WORD_CACHE_DIR set it is loaded from and saved to disk, so restarts
+    and other worker processes start warm.
+    """
+
+    def __init__(self, name, func, max_words=WORD_CACHE_SIZE, directory=WORD_CACHE_DIR):
+        self.func = func
+        self.entries = ByteLRU(max_words, sizeof=lambda form: 1)
+        self.stats = {"hits": 0, "misses": 0}
+        self.path = os.path.join(directory, f"{name}.json") if directory else None
+        self.unsaved = 0
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                for word, form in json.load(f):
+                    self.entries.put(word, form)
+
+    def __call__(self, word):
+        form = self.entries.get(word)
+        if form is not None:
+            self.stats["hits"] += 1
+            return form
+        self.stats["misses"] += 1
+        form = self.func(word)
+        self.entries.put(word, form)
+        self.unsaved += 1
+        if self.path and self.unsaved >= WORD_CACHE_SAVE_EVERY:
+            self.save()
+        return form
+
+    def map_words(self, words):
+        """Normalize each distinct word once; returns {word: form}."""
+        return {word: self(word) for word in set(words)}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries.items(), f)
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+    def report(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "words": len(self.entries)}
+
+stem_cache = WordCache("stems", ps.stem)
+lemma_cache = WordCache("lemmas", lemmatizer.lemmatize)
+
+def save_word_caches():
+    for cache in (stem_cache, lemma_cache):
+        if cache.unsaved:
+            cache.save()
+
+# Text workers exit through sys.exit when the executor shuts down, which runs this
+atexit.register(save_word_caches)
+
+def word_cache_report():
+    """Stats of this process's caches; every text worker process has its own."""
+    return {"pid": os.getpid(), "stems": stem_cache.report(), "lemmas": lemma_cache.report()}
+
+# The stopword list and the torchtext tokenizer are loaded on first use:
+# torchtext pulls in torch, which whitespace-only text jobs never need
+@lru_cache(maxsize=None)
+def get_stop_words():
+    return frozenset(stopwords.words('english'))
+
+@lru_cache(maxsize=None)
+def get_basic_english():
+    from torchtext.data.utils import get_tokenizer
+    return get_tokenizer('basic_english')
+
+def basic_english(line):
+    return get_basic_english()(line)
 
 def preprocess_text(text):
     # Remove special characters and digits
     text = re.sub(r'[^a-zA-Z\s]', '', text)
     return text
 
-def tokenize(text):
+def read_lines(file_path):
+    """Read a text file into a list of lines."""
+    with open(file_path, 'r') as f:
+        return f.readlines()
+
+def tokenize_line(line):
     # Tokenization logic
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    tokenizer = get_tokenizer('basic_english')
-    tokens = [' '.join(tokenizer(line)) for line in lines]
-    return '\n'.join(tokens)
+    return ' '.join(basic_english(line))
+
+def pad_truncate_line(line, max_length, pad_token=PAD_TOKEN):
+    """Pad with `pad_token` or truncate so the line has exactly `max_length` words."""
+    words = str(line).split()[:max_length]
+    if len(words) < max_length:
+        words = words + [pad_token]*(max_length - len(words))
+    return ' '.join(words)
+
+def lowercase_line(line):
+    return str(line).lower().strip()
+
+def remove_stopwords_line(line):
+    stop_words = get_stop_words()
+    words = word_tokenize(line)
+    filtered_words = [word for word in words if word.lower() not in stop_words]
+    return ' '.join(filtered_words)
+
+def noise_removal_line(line):
+    return re.sub(r'[^a-zA-Z\s]', '', line)
+
+def perform_stemming_line(line):
+    return ' '.join(stem_cache(word) for word in line.split())
+
+def perform_lemmatization_line(line):
+    return ' '.join(lemma_cache(word) for word in line.split())
+
+def tokenize_lines(lines):
+    return [tokenize_line(line) for line in lines]
+
+def padding_truncating_lines(lines, max_length=None, pad_token=PAD_TOKEN):
+    # Without a fixed length, pad to the longest line (needs a pass to find it)
+    if max_length is None:
+        max_length = max([len(str(s).split()) for s in lines])
+    return [pad_truncate_line(line, max_length, pad_token) for line in lines]
+
+def lowercase_lines(lines):
+    return [lowercase_line(line) for line in lines]
+
+def remove_stopwords_lines(lines):
+    return [remove_stopwords_line(line) for line in lines]
+
+def noise_removal_lines(lines):
+    return [noise_removal_line(line) for line in lines]
+
+def _map_lines(lines, cache):
+    # Normalize the document's distinct words in one pass, then rebuild each line
+    split = [line.split() for line in lines]
+    forms = cache.map_words(word for words in split for word in words)
+    return [' '.join(forms[word] for word in words) for words in split]
+
+def perform_stemming_lines(lines):
+    return _map_lines(lines, stem_cache)
+
+def perform_lemmatization_lines(lines):
+    return _map_lines(lines, lemma_cache)
+
+def tokenize(text):
+    return '\n'.join(tokenize_lines(read_lines(text)))
 
 def padding_truncating(text):
-    PAD_TOKEN = '<PAD>'
-    # Padding/Truncating logic
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    max_length = max([len(str(s).split()) for s in lines])
-    op=[]
-    for line in lines:
-        line = str(line).split()
-        if len(line) < max_length:
-            line = line + [PAD_TOKEN]*(max_length - len(line))
-        op.append(' '.join(line))
-    return '\n'.join(op)
+    return '\n'.join(padding_truncating_lines(read_lines(text)))
 
 def lowercase(text):
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    op = [str(s).lower().strip() for s in lines]
-    return '\n'.join(op)
+    return '\n'.join(lowercase_lines(read_lines(text)))
 
 def remove_stopwords(text):
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    cleaned_lines = []
-    for line in lines:
-        words = word_tokenize(line)
-        filtered_words = [word for word in words if word.lower() not in stop_words]
-        cleaned_line = ' '.join(filtered_words)
-        cleaned_lines.append(cleaned_line)
-    return '\n'.join(cleaned_lines)
+    return '\n'.join(remove_stopwords_lines(read_lines(text)))
 
 def noise_removal(text):
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    op = []
-    for line in lines:
-        line = re.sub(r'[^a-zA-Z\s]', '', line)
-        op.append(line)
-    return '\n'.join(op)
+    return '\n'.join(noise_removal_lines(read_lines(text)))
 
 def perform_stemming(text):
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    op = []
-    for line in lines:
-        line = [ps.stem(word) for word in line.split()]
-        op.append(' '.join(line))
-    return '\n'.join(op)
+    return '\n'.join(perform_stemming_lines(read_lines(text)))
 
 def perform_lemmatization(text):
-    with open(text, 'r') as f:
-        lines = f.readlines()
-    op = []
-    for line in lines:
-        line = [lemmatizer.lemmatize(word) for word in line.split()]
-        op.append(' '.join(line))
-    return '\n'.join(op)
-
+    return '\n'.join(perform_lemmatization_lines(read_lines(text)))
 
@@ -0,0 +1,109 @@
+"""
+Streaming text engine: lines flow one at a time through a chain of line-level
+ops, so memory use does not depend on the size of the corpus.
+
+Usage:
+    python -m utils.text_stream INPUT OUTPUT --steps '[{"option": "Lowercase"}, {"option": "Stemming"}]'
+"""
+import argparse
+import itertools
+import json
+
+from utils import text_processing, text_augmentation
+
+LINE_OPS = {
+    "Tokenize": text_processing.tokenize_line,
+    "Padding/Truncating": text_processing.pad_truncate_line,
+    "Lowercase": text_processing.lowercase_line,
+    "StopWord Removal": text_processing.remove_stopwords_line,
+    "Noise Removal": text_processing.noise_removal_line,
+    "Stemming": text_processing.perform_stemming_line,
+    "Lemmatization": text_processing.perform_lemmatization_line,
+    "Synonym Replacement": text_augmentation.synonym_replacement_line,
+    "Random Insertion": text_augmentation.random_insertion_line,
+    "Random Deletion": text_augmentation.random_deletion_line,
+    "Random Swap": text_augmentation.random_swap_line,
+}
+
+# Lines written per chunk of a streamed HTTP response
+CHUNK_LINES = 1000
+
+
+def get_line_ops(steps):
+    """Resolve steps to (line op, params) pairs, checking them before any line is read."""
+    ops = []
+    for step in steps:
+        option = step.get("option")
+        if option not in LINE_OPS:
+            raise ValueError(f"Invalid option selected: {option}")
+        params = step.get("params") or {}
+        # Padding to the longest line would need a second pass over the corpus
+        if option == "Padding/Truncating" and "max_length" not in params:
+            raise ValueError("Padding/Truncating needs a fixed max_length when streaming")
+        ops.append((LINE_OPS[option], params))
+    return ops
+
+
+def iter_lines(file_path):
+    """Yield the lines of a file without their line endings."""
+    with open(file_path, 'r') as f:
+        for line in f:
+            yield line.rstrip('\n')
+
+
+def stream_lines(lines, steps):
+    """Apply the steps to each line of an iterable, yielding results one at a time."""
+    ops = get_line_ops(steps)
+    for line in lines:
+        for op, params in ops:
+            line = op(line, **params)
+        yield line
+
+
+def stream_file(file_path, steps, output):
+    """Process `file_path` line by line, writing results to the text stream `output`."""
+    count = 0
+    for line in stream_lines(iter_lines(file_path), steps):
+        output.write(line + '\n')
+        count += 1
+    return count
+
+
+def _chunks(file_path, steps, chunk_lines):
+    buffer = []
+    for line in stream_lines(iter_lines(file_path), steps):
+        buffer.append(line)
+        if len(buffer) >= chunk_lines:
+            yield ('\n'.join(buffer) + '\n').encode('utf-8')
+            buffer = []
+    if buffer:
+        yield ('\n'.join(buffer) + '\n').encode('utf-8')
+
+
+def iter_chunks(file_path, steps, chunk_lines=CHUNK_LINES):
+    """
+    Return an iterator of encoded chunks of processed lines, for a chunked HTTP
+    response. The steps are checked, the file opened and the first chunk
+    processed right away, so bad steps or unreadable input raise here instead
+    of cutting a response short.
+    """
+    get_line_ops(steps)
+    chunks = _chunks(file_path, steps, chunk_lines)
+    first = next(chunks, None)
+    return itertools.chain([first] if first is not None else [], chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a text corpus through a chain of text ops.")
+    parser.add_argument("input", help="Input text file")
+    parser.add_argument("output", help="Output text file")
+    parser.add_argument("--steps", required=True, help="JSON list of steps")
+    args = parser.parse_args()
+
+    with open(args.output, 'w') as output:
+        count = stream_file(args.input, json.loads(args.steps), output)
+    print(f"Processed {count} lines")
+
+
+if __name__ == "__main__":
+    main()
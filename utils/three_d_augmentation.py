@@ -1,18 +1,119 @@
 import numpy as np
-import trimesh
 import os
 from scipy.spatial.transform import Rotation
 
+from utils.mesh_io import load_off, save_off, FORMATTERS
+
+# Most vertices one batch may hold across its k copies (a float64 (K, V, 3) stack of about 200 MB)
+MAX_3D_BATCH_VERTICES = int(os.environ.get("MAX_3D_BATCH_VERTICES", 8 * 1024 * 1024))
+
+class BatchTooLargeError(ValueError):
+    """Raised when k copies of a mesh would exceed MAX_3D_BATCH_VERTICES."""
+
 def load_off_file(file_path):
     """Load OFF file and return vertices and faces"""
-    mesh = trimesh.load(file_path)
-    return mesh.vertices, mesh.faces
+    return load_off(file_path)
 
 def save_off_file(vertices, faces, output_path):
     """Save vertices and faces as OFF file"""
-    mesh = trimesh.Trimesh(vertices=vertices, faces=faces)
-    mesh.export(output_path)
-    return output_path
+    return save_off(vertices, faces, output_path)
+
+def rotation_vertices(vertices, faces):
+    """
+    Apply random rotation to vertices
+    """
+    # Generate random rotation angles
+    angles = np.random.uniform(0, 360, 3)  # Random angles for x, y, z axes
+    rotation = Rotation.from_euler('xyz', angles, degrees=True)
+    
+    # Apply rotation
+    return rotation.apply(vertices), faces
+
+def scaling_vertices(vertices, faces):
+    """
+    Apply random per-axis scaling to vertices
+    """
+    # Generate random scale factors for each axis
+    scale_factors = np.random.uniform(0.5, 1.5, 3)  # Random scale between 0.5 and 1.5
+    
+    # Apply scaling
+    return vertices * scale_factors, faces
+
+def adding_noise_vertices(vertices, faces):
+    """
+    Add random noise to vertex positions
+    """
+    # Calculate model scale for appropriate noise magnitude
+    model_scale = np.max(np.abs(vertices))
+    noise_magnitude = model_scale * 0.02  # 2% of model scale
+    
+    # Generate and apply random noise
+    noise = np.random.normal(0, noise_magnitude, vertices.shape)
+    return vertices + noise, faces
+
+def rotation_batch(stack):
+    """
+    Rotate each mesh of a (K, V, 3) stack by its own uniformly random rotation
+    """
+    matrices = Rotation.random(len(stack)).as_matrix()  # (K, 3, 3)
+    # Batched matmul, i.e. einsum('kij,kvj->kvi'), dispatched to BLAS
+    return stack @ matrices.transpose(0, 2, 1)
+
+def scaling_batch(stack):
+    """
+    Scale each mesh of a (K, V, 3) stack by its own random per-axis factors
+    """
+    scale_factors = np.random.uniform(0.5, 1.5, (len(stack), 1, 3))
+    return stack * scale_factors
+
+def adding_noise_batch(stack):
+    """
+    Add vertex noise of 2% of each mesh's own scale to a (K, V, 3) stack
+    """
+    model_scale = np.max(np.abs(stack), axis=(1, 2), keepdims=True)
+    return stack + np.random.standard_normal(stack.shape) * (model_scale * 0.02)
+
+BATCH_OPS = {
+    "Rotation": rotation_batch,
+    "Scaling": scaling_batch,
+    "Adding Noise": adding_noise_batch,
+}
+
+def augment_batch(vertices, k, options):
+    """
+    Generate K augmented copies of one mesh as a (K, V, 3) stack, applying the
+    options in order to all copies at once
+    """
+    for option in options:
+        if option not in BATCH_OPS:
+            raise ValueError(f"Invalid option selected: {option}")
+    stack = np.broadcast_to(vertices, (k,) + vertices.shape)
+    for option in options:
+        stack = BATCH_OPS[option](stack)
+    return np.array(stack)
+
+def augment_file_batch(file_path, k, options, output_format='npz'):
+    """
+    Load the mesh once and encode K augmented copies: one stacked .npz
+    (vertices (K, V, 3), shared faces) or K separate .off/.ply meshes.
+    Returns a list of (body, media_type); the caller stores them. Raises
+    BatchTooLargeError when k * V exceeds MAX_3D_BATCH_VERTICES.
+    """
+    try:
+        vertices, faces = load_off_file(file_path)
+        if k * len(vertices) > MAX_3D_BATCH_VERTICES:
+            raise BatchTooLargeError(f"{k} copies of {len(vertices)} vertices exceed the batch limit of "
+                                     f"{MAX_3D_BATCH_VERTICES} vertices; lower k")
+        stack = augment_batch(vertices, k, options)
+
+        formatter, media_type = FORMATTERS[output_format]
+        if output_format == 'npz':
+            return [(formatter(stack, faces), media_type)]
+        return [(formatter(variant, faces), media_type) for variant in stack]
+    except BatchTooLargeError:
+        raise
+    except Exception as e:
+        return f"Error in batch augmentation: {str(e)}"
 
 def rotation(file_path):
     """
@@ -20,13 +121,7 @@ def rotation(file_path):
     """
     try:
         vertices, faces = load_off_file(file_path)
-        
-        # Generate random rotation angles
-        angles = np.random.uniform(0, 360, 3)  # Random angles for x, y, z axes
-        rotation = Rotation.from_euler('xyz', angles, degrees=True)
-        
-        # Apply rotation
-        rotated_vertices = rotation.apply(vertices)
+        rotated_vertices, faces = rotation_vertices(vertices, faces)
         
         # Save the rotated mesh
         output_path = os.path.join(os.path.dirname(file_path), 'rotated_' + os.path.basename(file_path))
@@ -42,12 +137,7 @@ def scaling(file_path):
     """
     try:
         vertices, faces = load_off_file(file_path)
-        
-        # Generate random scale factors for each axis
-        scale_factors = np.random.uniform(0.5, 1.5, 3)  # Random scale between 0.5 and 1.5
-        
-        # Apply scaling
-        scaled_vertices = vertices * scale_factors
+        scaled_vertices, faces = scaling_vertices(vertices, faces)
         
         # Save the scaled mesh
         output_path = os.path.join(os.path.dirname(file_path), 'scaled_' + os.path.basename(file_path))
@@ -63,14 +153,7 @@ def adding_noise(file_path):
     """
     try:
         vertices, faces = load_off_file(file_path)
-        
-        # Calculate model scale for appropriate noise magnitude
-        model_scale = np.max(np.abs(vertices))
-        noise_magnitude = model_scale * 0.02  # 2% of model scale
-        
-        # Generate and apply random noise
-        noise = np.random.normal(0, noise_magnitude, vertices.shape)
-        noisy_vertices = vertices + noise
+        noisy_vertices, faces = adding_noise_vertices(vertices, faces)
         
         # Save the noisy mesh
         output_path = os.path.join(os.path.dirname(file_path), 'noisy_' + os.path.basename(file_path))
@@ -1,11 +1,15 @@
 import numpy as np
-import trimesh
 import os
 
+from utils.mesh_io import load_off, format_off, save_off
+
 def load_off_file(file_path):
     """Load OFF file and return vertices and faces"""
-    mesh = trimesh.load(file_path)
-    return mesh.vertices, mesh.faces
+    return load_off(file_path)
+
+def off_to_bytes(vertices, faces):
+    """Serialize vertices and faces to OFF file contents"""
+    return format_off(vertices, faces)
 
 def save_off_file(vertices, faces, output_path):
     """Save vertices and faces as OFF file"""
@@ -13,21 +17,32 @@ def save_off_file(vertices, faces, output_path):
         # Ensure the directory exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
-        with open(output_path, 'w') as f:
-            # Write OFF header
-            f.write('OFF\n')
-            # Write number of vertices, faces, and edges (0 for edges)
-            f.write(f'{len(vertices)} {len(faces)} 0\n')
-            # Write vertices
-            for v in vertices:
-                f.write(f'{v[0]} {v[1]} {v[2]}\n')
-            # Write faces
-            for face in faces:
-                f.write(f'{len(face)} {" ".join(map(str, face))}\n')
-        return output_path
+        return save_off(vertices, faces, output_path)
     except Exception as e:
         return f"Error saving file: {str(e)}"
 
+def normalization_vertices(vertices, faces):
+    """
+    Normalize vertices to have unit scale
+    """
+    # Calculate the scale factor
+    scale_factor = np.max(np.abs(vertices))
+    if scale_factor == 0:
+        raise ValueError("Invalid model - zero scale factor")
+    
+    # Normalize vertices
+    return vertices / scale_factor, faces
+
+def centering_vertices(vertices, faces):
+    """
+    Center vertices at origin (0,0,0)
+    """
+    # Calculate center of mass
+    center = np.mean(vertices, axis=0)
+    
+    # Center vertices
+    return vertices - center, faces
+
 def normalization(file_path):
     """
     Normalize the 3D model to have unit scale
@@ -35,28 +50,19 @@ def normalization(file_path):
     try:
         vertices, faces = load_off_file(file_path)
         
-        # Calculate the scale factor
-        scale_factor = np.max(np.abs(vertices))
-        if scale_factor == 0:
-            return "Error: Invalid model - zero scale factor"
-        
-        # Normalize vertices
-        normalized_vertices = vertices / scale_factor
+        try:
+            normalized_vertices, faces = normalization_vertices(vertices, faces)
+        except ValueError as e:
+            return f"Error: {str(e)}"
         
         # Save in the same directory as input file
         output_path = os.path.join(os.path.dirname(file_path), 'normalized_' + os.path.basename(file_path))
-        print(f"Saving normalized file to: {output_path}")  # Debug print
         result = save_off_file(normalized_vertices, faces, output_path)
-        
-        # Verify file was saved
-        if os.path.exists(output_path):
-            print(f"File successfully saved at {output_path}")
-        else:
-            print(f"File not found at {output_path}")
+        if result != output_path:
+            return result
             
         return output_path
     except Exception as e:
-        print(f"Error in normalization: {str(e)}")  # Debug print
         return f"Error in normalization: {str(e)}"
 
 def centering(file_path):
@@ -65,12 +71,7 @@ def centering(file_path):
     """
     try:
         vertices, faces = load_off_file(file_path)
-        
-        # Calculate center of mass
-        center = np.mean(vertices, axis=0)
-        
-        # Center vertices
-        centered_vertices = vertices - center
+        centered_vertices, faces = centering_vertices(vertices, faces)
         
         # Save the centered mesh
         output_path = os.path.join(os.path.dirname(file_path), 'centered_' + os.path.basename(file_path))
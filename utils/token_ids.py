@@ -0,0 +1,145 @@
+"""
+Token-id output for text: the fused text steps are run once, tokens are mapped
+through a persisted vocabulary, and the result is an int32 (num_lines, max_len)
+id matrix plus a length per line, ready to feed a model without re-tokenizing.
+
+Usage:
+    python -m utils.token_ids corpus.txt out/ --steps '[{"option": "Lowercase"}]' --vocab corpus --bucket 8
+writes out/ids.npy and out/lengths.npy (loadable with np.load(..., mmap_mode='r')).
+"""
+import argparse
+import fcntl
+import io
+import json
+import os
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils import text_fused
+from utils.text_processing import read_lines, PAD_TOKEN
+
+VOCAB_DIR = os.environ.get("VOCAB_DIR", os.path.join(".cache", "vocab"))
+UNK_TOKEN = '<UNK>'
+# Padding is id 0, so an id matrix can be padded with zeros
+SPECIAL_TOKENS = [PAD_TOKEN, UNK_TOKEN]
+PAD_ID, UNK_ID = 0, 1
+
+
+def vocab_path(name):
+    if not name or os.path.basename(name) != name:
+        raise ValueError(f"Invalid vocabulary name: {name}")
+    return os.path.join(VOCAB_DIR, f"{name}.json")
+
+
+@contextmanager
+def vocab_lock(name):
+    """Serialize updates of one vocabulary across threads and worker processes."""
+    os.makedirs(VOCAB_DIR, exist_ok=True)
+    with open(vocab_path(name) + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_vocab(name):
+    """Token -> id mapping of a saved vocabulary, or a new one holding only the special tokens."""
+    path = vocab_path(name)
+    if not os.path.exists(path):
+        return {token: i for i, token in enumerate(SPECIAL_TOKENS)}
+    with open(path) as f:
+        return {token: i for i, token in enumerate(json.load(f))}
+
+
+def save_vocab(vocab, name):
+    path = vocab_path(name)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(sorted(vocab, key=vocab.get), f)
+    os.replace(tmp_path, path)
+
+
+def lookup_ids(token_lists, vocab, grow=True):
+    """Map tokens to ids; unseen tokens are added when `grow`, otherwise mapped to UNK_ID."""
+    if grow:
+        return [[vocab.setdefault(token, len(vocab)) for token in tokens] for tokens in token_lists]
+    return [[vocab.get(token, UNK_ID) for token in tokens] for tokens in token_lists]
+
+
+def to_matrix(id_lists, max_length=None, bucket=None):
+    """
+    Pack id lists into a PAD_ID-padded int32 (num_lines, max_len) matrix and an
+    int32 length vector. max_len is `max_length`, or the longest line rounded up
+    to a multiple of `bucket` so batches share a few fixed widths.
+    """
+    if max_length is None:
+        max_length = max((len(ids) for ids in id_lists), default=0)
+        if bucket:
+            max_length = -(-max_length // bucket) * bucket
+    lengths = np.array([min(len(ids), max_length) for ids in id_lists], dtype=np.int32)
+    matrix = np.full((len(id_lists), max_length), PAD_ID, dtype=np.int32)
+    if lengths.sum():
+        filled = np.arange(max_length)[None, :] < lengths[:, None]
+        matrix[filled] = np.concatenate([ids[:max_length] for ids in id_lists])
+    return matrix, lengths
+
+
+def encode_lines(lines, steps, vocab_name="default", grow_vocab=True, max_length=None, bucket=None):
+    """
+    Run the fused text steps and return (ids matrix, lengths, vocab size). A
+    Padding/Truncating step sets the width instead of adding pad tokens.
+    """
+    padding = [step for step in steps if step.get("option") == "Padding/Truncating"]
+    steps = [step for step in steps if step.get("option") != "Padding/Truncating"]
+    if padding and max_length is None:
+        max_length = (padding[-1].get("params") or {}).get("max_length")
+    tokenizer = text_fused.tokenizer_for([step.get("option") for step in steps])
+    token_lists = text_fused.fused_tokens(lines, steps, tokenizer)
+
+    with vocab_lock(vocab_name):
+        vocab = load_vocab(vocab_name)
+        size = len(vocab)
+        id_lists = lookup_ids(token_lists, vocab, grow_vocab)
+        if len(vocab) > size:
+            save_vocab(vocab, vocab_name)
+    matrix, lengths = to_matrix(id_lists, max_length, bucket)
+    return matrix, lengths, len(vocab)
+
+
+def to_npz_bytes(matrix, lengths):
+    """Uncompressed .npz with "ids" and "lengths", for a binary response."""
+    buffer = io.BytesIO()
+    np.savez(buffer, ids=matrix, lengths=lengths)
+    return buffer.getvalue()
+
+
+def encode_file_to_npz(file_path, steps, vocab_name="default", grow_vocab=True, max_length=None, bucket=None):
+    """Worker entry point: returns (npz bytes, matrix shape, vocab size)."""
+    matrix, lengths, vocab_size = encode_lines(read_lines(file_path), steps, vocab_name, grow_vocab,
+                                               max_length, bucket)
+    return to_npz_bytes(matrix, lengths), list(matrix.shape), vocab_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode a text corpus as a padded int32 token-id matrix.")
+    parser.add_argument("input", help="Input text file")
+    parser.add_argument("output_dir", help="Directory for ids.npy and lengths.npy")
+    parser.add_argument("--steps", default="[]", help="JSON list of text steps")
+    parser.add_argument("--vocab", default="default", help="Vocabulary name (stored in VOCAB_DIR)")
+    parser.add_argument("--frozen", action="store_true", help="Map unseen tokens to <UNK> instead of adding them")
+    parser.add_argument("--max-length", type=int, help="Fixed row width")
+    parser.add_argument("--bucket", type=int, help="Round the longest line up to a multiple of this")
+    args = parser.parse_args()
+
+    matrix, lengths, vocab_size = encode_lines(read_lines(args.input), json.loads(args.steps), args.vocab,
+                                               not args.frozen, args.max_length, args.bucket)
+    os.makedirs(args.output_dir, exist_ok=True)
+    np.save(os.path.join(args.output_dir, "ids.npy"), matrix)
+    np.save(os.path.join(args.output_dir, "lengths.npy"), lengths)
+    print(f"Wrote {matrix.shape[0]} x {matrix.shape[1]} ids, vocabulary of {vocab_size} tokens")
+
+
+if __name__ == "__main__":
+    main()